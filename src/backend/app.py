@@ -3,22 +3,12 @@ import logging
 import subprocess
 import json
 import datetime
+from functools import lru_cache
 from fastapi import FastAPI, HTTPException, Body  
-from fastapi.responses import JSONResponse  
-from azure.identity import DefaultAzureCredential  
+from fastapi.responses import JSONResponse, StreamingResponse  
 from opentelemetry.trace import get_tracer
 
-from conversation_store import ConversationStore  
-from foundry.handler import Handler  
-  
-import util
-
-util.load_dotenv_from_azd()
-
-# Initialize tracing early - MUST be done before any agent/orchestrator imports
-from tracing import setup_tracing
-setup_tracing()
-
+# Configure logging first: importing the orchestrators sets up tracing, which logs
 root_logger = logging.getLogger()
 root_logger.setLevel(logging.INFO)
 handler = logging.StreamHandler()
@@ -32,16 +22,83 @@ handler.setFormatter(formatter)
 root_logger.handlers.clear()
 root_logger.addHandler(handler)
 
+from conversation_store import ConversationStore  
+from foundry.handler import Handler, wait_for_pending_writes  
+from foundry.agents.banking.news.news_functions import close_news_search_functions
+  
+import util
+
+util.load_dotenv_from_azd()
+
+# Initialize tracing early - MUST be done before any agent/orchestrator imports
+from tracing import setup_tracing
+setup_tracing()
+
 logging.getLogger('azure.core.pipeline.policies.http_logging_policy').setLevel(logging.WARNING)
 logging.getLogger('azure.monitor.opentelemetry.exporter.export').setLevel(logging.WARNING)
 logging.getLogger('azure.cosmos._cosmos_http_logging_policy').setLevel(logging.WARNING)
 
 app = FastAPI()
 
-@app.post("/http_trigger")
-async def http_trigger(request_body: dict = Body(...)):
-    logging.info('Agentic Advisory - HTTP trigger function processed a request.')
-        
+@lru_cache(maxsize=None)
+def get_conversation_store(container_name):
+    """Get the process-wide ConversationStore for a use case container."""
+    return ConversationStore(
+        url=os.getenv("COSMOSDB_ENDPOINT"),
+        key=util.get_async_azure_credential(),
+        database_name=os.getenv("COSMOSDB_DATABASE_NAME"),
+        container_name=container_name
+    )
+
+
+@lru_cache(maxsize=None)
+def get_handler(container_name, use_foundry):
+    """
+    Get the process-wide Handler for a use case container.
+
+    Orchestrators create their agents once and reuse them across requests,
+    so the handler (and its orchestrators) must outlive a single request.
+    """
+    return Handler(get_conversation_store(container_name), use_foundry=use_foundry)
+
+
+# Use cases warmed up at startup, with the env variable naming their Cosmos container
+WARMUP_USECASE_CONTAINERS = {
+    'fsi_insurance': "COSMOSDB_CONTAINER_FSI_INS_USER_NAME",
+    'fsi_banking': "COSMOSDB_CONTAINER_FSI_BANK_USER_NAME",
+}
+
+@app.on_event("startup")
+async def warmup():
+    # Pay for credential probing, Cosmos setup and agent creation before the
+    # first user request instead of during it (STARTUP_WARMUP=false skips it, e.g. in dev)
+    if os.getenv("STARTUP_WARMUP", "true").lower() not in ("true", "1", "yes"):
+        return
+    use_foundry = os.getenv("USE_FOUNDRY", "true").lower() == "true"
+    for usecase_type, container_env in WARMUP_USECASE_CONTAINERS.items():
+        container_name = os.getenv(container_env)
+        if not container_name:
+            continue
+        try:
+            await get_handler(container_name, use_foundry).warmup([usecase_type])
+            logging.info("Warmed up use case %s", usecase_type)
+        except Exception:
+            # The first request retries whatever failed here
+            logging.exception("Warmup failed for use case %s", usecase_type)
+
+@app.on_event("shutdown")
+async def flush_conversation_writes():
+    # Conversation turns are persisted write-behind; don't drop them on shutdown
+    await wait_for_pending_writes()
+    await close_news_search_functions()
+
+async def prepare_request(request_body: dict):
+    """
+    Validate a chat request and load what is needed to handle it.
+
+    Returns:
+        Tuple of (handler, keyword arguments for Handler.handle_request)
+    """
     # Extract parameters from the request body  
     user_id = request_body.get('user_id')
     chat_id = request_body.get('chat_id')  # None if starting a new chat
@@ -49,7 +106,7 @@ async def http_trigger(request_body: dict = Body(...)):
     load_history = request_body.get('load_history')
     usecase_type = request_body.get('use_case')
     is_deep_research = request_body.get('is_deep_research')
-    logging.info(f'is_deep_research = {is_deep_research}')
+    logging.info('is_deep_research = %s', is_deep_research)
   
     # Validate required parameters
     if not user_id:
@@ -62,9 +119,6 @@ async def http_trigger(request_body: dict = Body(...)):
         raise HTTPException(status_code=400, detail="<usecase_type> is required!")
     
 
-    # Authenticate using DefaultAzureCredential  
-    key = DefaultAzureCredential()
-
     # Select use case container based on usecase_type  
     if usecase_type == 'fsi_insurance':  
         container_name = os.getenv("COSMOSDB_CONTAINER_FSI_INS_USER_NAME")  
@@ -75,45 +129,53 @@ async def http_trigger(request_body: dict = Body(...)):
     else:  
         raise HTTPException(status_code=400, detail="Use case not recognized/not implemented...")  
 
-    # Initialize the ConversationStore with Cosmos DB configurations  
-    # TODO: 1. This part needs t be moved to handler
-    db = ConversationStore(  
-        url=os.getenv("COSMOSDB_ENDPOINT"),  
-        key=key,  
-        database_name=os.getenv("COSMOSDB_DATABASE_NAME"),  
-        container_name=container_name  
-    )  
+    # Shared ConversationStore for the use case container (Cosmos DB)
+    db = get_conversation_store(container_name)
+
+    # Read-your-writes: let this user's previous turn finish persisting first
+    await wait_for_pending_writes(user_id)
 
-    # Check if user exists, if not create a new user  
-    if not db.read_user_info(user_id):  
+    # Check if user exists, if not create a new user (one read either way)
+    user_data = await db.read_user_info(user_id)
+    if not user_data:  
         user_data = {'chat_histories': {}}  
-        db.create_user(user_id, user_data)  
+        await db.create_user(user_id, user_data)  
 
-    user_data = db.read_user_info(user_id)  
     # //: 1
 
     # Decide the USE_FOUNDRY environment variable
     use_foundry = os.getenv("USE_FOUNDRY", "true").lower() == "true"
-    handler = Handler(db, use_foundry=use_foundry)
+    handler = get_handler(container_name, use_foundry)
 
-    logging.info(f"Handling request with Foundry mode = {use_foundry}")
+    logging.info("Handling request with Foundry mode = %s", use_foundry)
+
+    return handler, dict(
+        user_id=user_id,
+        chat_id=chat_id,
+        user_message=user_message,
+        load_history=load_history,
+        usecase_type=usecase_type,
+        user_data=user_data,
+        is_deep_research=is_deep_research
+    )
+
+@app.post("/http_trigger")
+async def http_trigger(request_body: dict = Body(...)):
+    logging.info('Agentic Advisory - HTTP trigger function processed a request.')
+
+    handler, request = await prepare_request(request_body)
+    load_history = request['load_history']
 
     try:  
-        result = await handler.handle_request(
-            user_id=user_id,
-            chat_id=chat_id,
-            user_message=user_message,
-            load_history=load_history,
-            usecase_type=usecase_type,
-            user_data=user_data,
-            is_deep_research=is_deep_research
-        )  
+        result = await handler.handle_request(**request)  
     except Exception as e:  
-        logging.error(f"Error in handler: {e}")  
+        logging.error("Error in handler: %s", e)  
         raise HTTPException(status_code=500, detail="agent-error")  
 
     status_code = result.get("status_code", 200)  
-    logging.info(f"Status result = {result}")  
+    logging.info("Status result = %s", status_code)
+    # The full result carries the reply (or the whole history), so only log it when debugging
+    logging.debug("Result = %s", result)
 
     if status_code != 200:  
         error_message = result.get("error", "Unknown error")  
@@ -134,4 +196,42 @@ async def http_trigger(request_body: dict = Body(...)):
     return JSONResponse(  
         content={"chat_id": chat_id, "reply": new_messages},  
         status_code=200  
-    )  
\ No newline at end of file
+    )  
+
+@app.post("/http_trigger/stream")
+async def http_trigger_stream(request_body: dict = Body(...)):
+    """
+    Same request as /http_trigger, answered as newline-delimited JSON events.
+
+    {"type": "delta", "name": ..., "content": ...} lines stream the reply text as the
+    agents generate it; the last line carries the complete outcome:
+    {"type": "reply", "chat_id": ..., "reply": [...]}, {"type": "history", "data": [...]}
+    or {"type": "error", "status_code": ..., "error": ...}.
+    """
+    logging.info('Agentic Advisory - HTTP stream trigger function processed a request.')
+
+    handler, request = await prepare_request(request_body)
+    load_history = request['load_history']
+
+    async def events():
+        try:
+            async for kind, data in handler.handle_request_stream(**request):
+                if kind == "delta":
+                    yield util.json_dumps({"type": "delta", **data}) + "\n"
+                else:
+                    result = data
+        except Exception as e:
+            logging.error("Error in handler: %s", e)
+            result = {"status_code": 500, "error": "agent-error"}
+
+        status_code = result.get("status_code", 200)
+        logging.info("Status result = %s", status_code)
+        if status_code != 200:
+            event = {"type": "error", "status_code": status_code, "error": result.get("error", "Unknown error")}
+        elif load_history is True:
+            event = {"type": "history", "data": result.get("data", [])}
+        else:
+            event = {"type": "reply", "chat_id": result.get("chat_id"), "reply": result.get("reply", [])}
+        yield util.json_dumps(event) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
@@ -1,7 +1,20 @@
-from azure.cosmos import CosmosClient, PartitionKey, exceptions
+from azure.cosmos import PartitionKey, exceptions
+from azure.cosmos.aio import CosmosClient
+from azure.cosmos.partition_key import NonePartitionKeyValue
+import asyncio
 import datetime
 import random
+import uuid
 
+# User documents are keyed by 'id' and carry no '/user_id' field, so they live
+# under the "missing" partition key value.
+USER_PARTITION_KEY = NonePartitionKeyValue
+
+# Random draws of the short daily chat id before falling back to a longer one
+CHAT_ID_ATTEMPTS = 20
+
+# The store uses the async Cosmos client so reads and writes are awaited on the
+# event loop instead of blocking it (and every other in-flight request).
 class ConversationStore:
     def __init__(self, url, key, database_name, container_name):
         self.client = CosmosClient(url, credential=key)
@@ -9,18 +22,26 @@ class ConversationStore:
         self.container_name = container_name
         self.db = None
         self.container = None
-        self.initialize_database()
-        self.initialize_container()
+        # Database/container creation needs I/O, so it runs on first use
+        self._init_lock = asyncio.Lock()
+
+    async def initialize(self):
+        if self.container is not None:
+            return
+        async with self._init_lock:
+            if self.container is None:
+                await self.initialize_database()
+                await self.initialize_container()
 
-    def initialize_database(self):
+    async def initialize_database(self):
         try:
-            self.db = self.client.create_database_if_not_exists(id=self.database_name)
+            self.db = await self.client.create_database_if_not_exists(id=self.database_name)
         except exceptions.CosmosResourceExistsError:
             self.db = self.client.get_database_client(database=self.database_name)
 
-    def initialize_container(self):
+    async def initialize_container(self):
         try:
-            self.container = self.db.create_container_if_not_exists(
+            self.container = await self.db.create_container_if_not_exists(
                 id=self.container_name,
                 partition_key=PartitionKey(path="/user_id"),
                 offer_throughput=400
@@ -30,27 +51,29 @@ class ConversationStore:
             
         
         # User (RM)
-    def create_user(self, user_id, user_data):
+    async def create_user(self, user_id, user_data):
+        await self.initialize()
         # Ensure the user_data dict has an 'id' key
         user_data['id'] = user_id  # Use the user_id as the document 'id'
         
         try:
             # Create a new document in the container
-            created_user = self.container.create_item(body=user_data)
+            created_user = await self.container.create_item(body=user_data)
             print(f"Created new user with id: {user_id}")
             return 
         except Exception as e:
             print(f"An error occurred: {e}")
             return None
 
-    def read_user_info(self, user_id):
+    async def read_user_info(self, user_id):
+        await self.initialize()
         query = "SELECT * FROM c WHERE c.id=@userId"
         parameters = [{"name": "@userId", "value": user_id}]
-        items = list(self.container.query_items(
+        # The async client queries across partitions when no partition key is given
+        items = [item async for item in self.container.query_items(
             query=query,
-            parameters=parameters,
-            enable_cross_partition_query=True
-        ))
+            parameters=parameters
+        )]
 
         if items:
             item_dict = items[0]
@@ -59,9 +82,9 @@ class ConversationStore:
         else:
             return None
 
-    def update_user_info(self, user_id, updated_info):
+    async def update_user_info(self, user_id, updated_info):
         # Read the current information to get the document's id and _etag
-        user_document = self.read_user_info(user_id)
+        user_document = await self.read_user_info(user_id)
         if not user_document:
             return None  # User does not exist
 
@@ -70,25 +93,61 @@ class ConversationStore:
             user_document[key] = value
         
         # Replace the document in the database
-        updated_document = self.container.replace_item(
+        updated_document = await self.container.replace_item(
             item=user_document,
             body=user_document
         )
         return updated_document
+
+    async def add_chat(self, user_id, chat_id, messages):
+        await self.initialize()
+        # Patch in just the new conversation instead of rewriting the user's whole history
+        return await self.container.patch_item(
+            item=user_id,
+            partition_key=USER_PARTITION_KEY,
+            patch_operations=[
+                {"op": "set", "path": f"/chat_histories/{chat_id}", "value": {'messages': messages}}
+            ]
+        )
+
+    async def append_messages(self, user_id, chat_id, messages):
+        await self.initialize()
+        # Append to the end of the conversation's message array (O(1) payload per turn)
+        return await self.container.patch_item(
+            item=user_id,
+            partition_key=USER_PARTITION_KEY,
+            patch_operations=[
+                {"op": "add", "path": f"/chat_histories/{chat_id}/messages/-", "value": message}
+                for message in messages
+            ]
+        )
     
-    
-    def generate_chat_id(self):
+    def generate_chat_id(self, existing_chat_ids=()):
+        # Generated locally (no round-trip); the chat is only persisted together
+        # with its first reply, so avoid ids the user already has instead of
+        # overwriting that conversation
         date_str = datetime.datetime.now().strftime("%Y%m%d")
-        random_digits = "{:03d}".format(random.randint(0, 999))
-        chat_id = f"{date_str}_{random_digits}"
-        return chat_id
+        for _ in range(CHAT_ID_ATTEMPTS):
+            random_digits = "{:03d}".format(random.randint(0, 999))
+            chat_id = f"{date_str}_{random_digits}"
+            if chat_id not in existing_chat_ids:
+                return chat_id
+        # Today's short ids are (nearly) used up: a random hex suffix can't collide in practice
+        return f"{date_str}_{uuid.uuid4().hex[:12]}"
     
-    def list_user_chats(self, user_id):
-        user_data = self.read_user_info(user_id)
+    async def list_user_chats(self, user_id):
+        user_data = await self.read_user_info(user_id)
         chat_histories = user_data.get('chat_histories', {})
         return list(chat_histories.keys())
     
-    def wipe_user_chats(self, user_id):
-        user_data = self.read_user_info(user_id)
-        user_data['chat_histories'] = {}
-        self.update_user_info(user_id, user_data)
\ No newline at end of file
+    async def wipe_user_chats(self, user_id):
+        await self.initialize()
+        # One small patch instead of reading the whole history and writing it back
+        try:
+            await self.container.patch_item(
+                item=user_id,
+                partition_key=USER_PARTITION_KEY,
+                patch_operations=[{"op": "set", "path": "/chat_histories", "value": {}}]
+            )
+        except exceptions.CosmosResourceNotFoundError:
+            return None  # User does not exist
\ No newline at end of file
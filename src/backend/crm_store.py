@@ -1,9 +1,24 @@
 from azure.cosmos import CosmosClient, PartitionKey, exceptions
 import os
+import re
 import json
 import datetime
 import random
 
+# Projected field names are interpolated into queries, so only plain identifiers are allowed
+_FIELD_NAME_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def _select_clause(projection):
+    """Build the SELECT clause for an optional list of top-level fields."""
+    if not projection:
+        return "SELECT *"
+    for field in projection:
+        if not _FIELD_NAME_RE.fullmatch(field):
+            raise ValueError(f"Invalid projection field: {field!r}")
+    return "SELECT " + ", ".join(f"c.{field}" for field in projection)
+
+
 class CRMStore:
     def __init__(self, url, key, database_name, container_name):
         self.client = CosmosClient(url, credential=key)
@@ -48,17 +63,21 @@ class CRMStore:
             return None
 
 
-    def get_customer_profile_by_full_name(self, full_name):
+    def get_customer_profile_by_full_name(self, full_name, projection=None):
         """
         Retrieves a customer profile from Cosmos DB based on a partial match of the customer's full name.
         
         Args:
         - full_name (str): The partial or full name of the customer to search for.
+        - projection (list[str], optional): Top-level fields to return instead of the whole document.
         
         Returns:
         - dict: The customer profile, if found.
+
+        Note: this is a cross-partition query; keep /fullName in the container's
+        indexing policy (the default policy indexes all paths).
         """
-        query = "SELECT * FROM c WHERE c.fullName LIKE @full_name"
+        query = f"{_select_clause(projection)} FROM c WHERE c.fullName LIKE @full_name"
         parameters = [
             {"name": "@full_name", "value": f"%{full_name}%"}
         ]
@@ -70,17 +89,25 @@ class CRMStore:
         return items[0] if items else None
     
 
-    def get_customer_profile_by_client_id(self, client_id):
+    def get_customer_profile_by_client_id(self, client_id, projection=None):
         """
         Retrieves a customer profile from Cosmos DB based on a client_id.
+
+        This is a cross-partition query: the profiles only carry `id` and
+        `clientID`, not the container's `/client_id` partition key, so a
+        point-read can't address them.
+        
+        With a projection, only those fields are returned, so the rest of the
+        document never leaves Cosmos DB.
         
         Args:
         - client_id (str): The client id of the customer to search for.
+        - projection (list[str], optional): Top-level fields to return instead of the whole document.
         
         Returns:
         - dict: The customer profile, if found.
         """
-        query = "SELECT * FROM c WHERE c.clientID = @client_id"
+        query = f"{_select_clause(projection)} FROM c WHERE c.clientID = @client_id"
         parameters = [
             {"name": "@client_id", "value": client_id}
         ]
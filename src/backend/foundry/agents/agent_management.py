@@ -16,7 +16,10 @@ Usage:
 
 import os
 import sys
+import json
 import asyncio
+import hashlib
+from functools import lru_cache
 from typing import Optional, Any
 from pathlib import Path
 from dotenv import load_dotenv
@@ -28,6 +31,37 @@ from azure.ai.projects.models import PromptAgentDefinition
 from azure.core.exceptions import ResourceNotFoundError
 
 
+def _find_env_file() -> Optional[Path]:
+    """Find the nearest .env file in this directory or up to 2 parent directories."""
+    current_dir = Path(__file__).resolve().parent
+    for _ in range(3):  # Check up to 3 levels
+        env_file = current_dir / ".env"
+        if env_file.exists():
+            return env_file
+        current_dir = current_dir.parent
+    return None
+
+
+# Resolved once at import instead of stat-ing the directory tree per AgentManager
+_DEFAULT_ENV_FILE = _find_env_file()
+
+
+@lru_cache(maxsize=None)
+def _load_env_file(env_path: str) -> None:
+    """Load a .env file once per process (values already set are never overridden anyway)."""
+    load_dotenv(dotenv_path=env_path)
+
+
+def _definition_hash(model: str, instructions: str, tools: Optional[list]) -> str:
+    """Fingerprint an agent definition so unchanged definitions can reuse the latest version."""
+    payload = {
+        "model": model,
+        "instructions": instructions,
+        "tools": [tool.as_dict() if hasattr(tool, "as_dict") else tool for tool in tools or []]
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
 class AgentManager:
     """
     Manager class for Microsoft Foundry Project agents.
@@ -54,16 +88,9 @@ class AgentManager:
         """
         # Load environment variables
         if env_path:
-            load_dotenv(dotenv_path=env_path)
-        else:
-            # Try to find .env in current and parent directories
-            current_dir = Path(__file__).parent
-            for i in range(3):  # Check up to 3 levels
-                env_file = current_dir / ".env"
-                if env_file.exists():
-                    load_dotenv(dotenv_path=str(env_file))
-                    break
-                current_dir = current_dir.parent
+            _load_env_file(str(env_path))
+        elif _DEFAULT_ENV_FILE:
+            _load_env_file(str(_DEFAULT_ENV_FILE))
         
         # Get Foundry configuration from environment 
         self.project_endpoint = (
@@ -77,6 +104,9 @@ class AgentManager:
         
         self._credential: Optional[AzureCliCredential] = None
         self._project_client: Optional[AIProjectClient] = None
+        # Agents listed from the project, keyed by name (invalidated on create/delete)
+        self._agents_by_name: Optional[dict[str, Any]] = None
+        self._agents_lock = asyncio.Lock()
     
     async def __aenter__(self):
         """Async context manager entry."""
@@ -111,6 +141,27 @@ class AgentManager:
             await self._credential.close()
             self._credential = None
     
+    async def _get_agents_by_name(self) -> dict[str, Any]:
+        """
+        Get the project's agents keyed by name, listing them only once per manager.
+        
+        Returns:
+            Dictionary mapping agent names to agent objects.
+        """
+        await self._ensure_client()
+        
+        # Concurrent callers (e.g. agents created in parallel) share one listing
+        async with self._agents_lock:
+            if self._agents_by_name is None:
+                self._agents_by_name = {
+                    agent.name: agent async for agent in self._project_client.agents.list()
+                }
+        return self._agents_by_name
+    
+    def _invalidate_agents(self):
+        """Drop the cached agent listing after the project's agents changed."""
+        self._agents_by_name = None
+    
     async def list_agents(self) -> list[dict[str, Any]]:
         """
         List all agents in the Microsoft Foundry project.
@@ -122,8 +173,8 @@ class AgentManager:
         
         agents_list = []
         try:
-            # Use the agents client to list agents
-            async for agent in self._project_client.agents.list():
+            # Use the (cached) agents listing
+            for agent in (await self._get_agents_by_name()).values():
                 agent_info = {
                     "name": agent.name,
                     "id": getattr(agent, "id", None),
@@ -163,7 +214,9 @@ class AgentManager:
         await self._ensure_client()
         
         try:
-            agent = await self._project_client.agents.get(agent_name)
+            agent = (await self._get_agents_by_name()).get(agent_name)
+            if agent is None:
+                return None
             
             agent_info = {
                 "name": agent.name,
@@ -198,24 +251,44 @@ class AgentManager:
         instructions: str,
         description: Optional[str] = None,
         model: Optional[str] = None,
-        tools: Optional[list] = None
+        tools: Optional[list] = None,
+        reuse_unchanged: bool = True
     ) -> dict[str, Any]:
         """
         Create a new agent version in the Microsoft Foundry project.
         
+        Each version is tagged with a hash of its definition; if the latest
+        version already has the same definition it is reused instead of
+        creating a new one.
+        
         Args:
             agent_name: The name of the agent to create.
             instructions: The agent's system instructions.
             description: Optional description of the agent.
             model: Model deployment name. Defaults to configured model.
             tools: Optional list of tools for the agent.
+            reuse_unchanged: If True, reuse the latest version when its definition is unchanged.
             
         Returns:
-            Created agent information dictionary.
+            Created (or reused) agent information dictionary.
         """
         await self._ensure_client()
         
         model = model or self.model_deployment_name
+        definition_hash = _definition_hash(model, instructions, tools)
+        
+        if reuse_unchanged:
+            existing_agent = (await self._get_agents_by_name()).get(agent_name)
+            latest = getattr(getattr(existing_agent, "versions", None), "latest", None)
+            if latest is not None and (getattr(latest, "metadata", None) or {}).get("definition_hash") == definition_hash:
+                return {
+                    "name": existing_agent.name,
+                    "version": latest.version,
+                    "id": getattr(latest, "id", f"{existing_agent.name}:{latest.version}"),
+                    "model": model,
+                    "instructions_preview": instructions[:100] + "..." if len(instructions) > 100 else instructions,
+                    "reused": True
+                }
         
         try:
             definition_args = {
@@ -229,8 +302,10 @@ class AgentManager:
             
             agent_version = await self._project_client.agents.create_version(
                 agent_name=agent_name,
-                definition=definition
+                definition=definition,
+                metadata={"definition_hash": definition_hash}
             )
+            self._invalidate_agents()
             
             return {
                 "name": agent_version.name,
@@ -273,19 +348,17 @@ class AgentManager:
         await self._ensure_client()
         
         if use_latest_version:
-            try:
-                existing_agent = await self._project_client.agents.get(agent_name)
-                if hasattr(existing_agent, "versions") and hasattr(existing_agent.versions, "latest"):
-                    latest = existing_agent.versions.latest
-                    return {
-                        "name": existing_agent.name,
-                        "version": latest.version,
-                        "id": getattr(latest, "id", f"{existing_agent.name}:{latest.version}"),
-                        "model": getattr(latest.definition, "model", None) if hasattr(latest, "definition") else None,
-                        "reused": True
-                    }
-            except ResourceNotFoundError:
-                pass  # Agent doesn't exist, create it
+            existing_agent = (await self._get_agents_by_name()).get(agent_name)
+            if existing_agent is not None and hasattr(existing_agent, "versions") and hasattr(existing_agent.versions, "latest"):
+                latest = existing_agent.versions.latest
+                return {
+                    "name": existing_agent.name,
+                    "version": latest.version,
+                    "id": getattr(latest, "id", f"{existing_agent.name}:{latest.version}"),
+                    "model": getattr(latest.definition, "model", None) if hasattr(latest, "definition") else None,
+                    "reused": True
+                }
+            # Agent doesn't exist, create it
         
         # Create new agent version
         result = await self.create_agent(
@@ -295,7 +368,7 @@ class AgentManager:
             model=model,
             tools=tools
         )
-        result["reused"] = False
+        result.setdefault("reused", False)
         return result
     
     async def delete_agent(self, agent_name: str, confirm: bool = True) -> bool:
@@ -327,6 +400,7 @@ class AgentManager:
             
             # Delete the agent
             await self._project_client.agents.delete(agent_name)
+            self._invalidate_agents()
             print(f"✅ Agent '{agent_name}' deleted successfully")
             return True
             
@@ -359,6 +433,7 @@ class AgentManager:
                 agent_name=agent_name,
                 agent_version=version
             )
+            self._invalidate_agents()
             print(f"✅ Agent '{agent_name}' version {version} deleted successfully")
             return True
             
@@ -392,15 +467,19 @@ class AgentManager:
                 print("❌ Deletion cancelled")
                 return 0
         
-        deleted_count = 0
-        for agent in agents:
+        async def delete(agent: dict[str, Any]) -> bool:
             try:
                 await self._project_client.agents.delete(agent['name'])
                 print(f"✅ Deleted: {agent['name']}")
-                deleted_count += 1
+                return True
             except Exception as e:
                 print(f"❌ Failed to delete {agent['name']}: {str(e)}")
+                return False
+        
+        # Deletions are independent round-trips, so issue them concurrently
+        deleted_count = sum(await asyncio.gather(*(delete(agent) for agent in agents)))
         
+        self._invalidate_agents()
         print(f"\n📊 Deleted {deleted_count}/{len(agents)} agents")
         return deleted_count
 
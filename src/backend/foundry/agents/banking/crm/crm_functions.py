@@ -1,12 +1,42 @@
+import os
+import re
 import json
 from pathlib import Path
+from functools import lru_cache
 from typing import Any, Callable, Dict, Optional
 
 # Import tracing utilities from backend root
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent))
 from tracing import get_tracing_manager
+from util import json_dumps, json_loads
+from foundry.agents.tool_cache import memoize_per_conversation
+from foundry.agents.tool_schema_utils import validate_tool_arguments
 
+# Profile fields returned to the agent; narrowing them (CRM_PROFILE_FIELDS) cuts prompt tokens
+CRM_PROFILE_FIELDS = tuple(
+    field.strip() for field in os.getenv(
+        "CRM_PROFILE_FIELDS",
+        "id,clientID,fullName,firstName,lastName,dateOfBirth,nationality,contactDetails,address,"
+        "financialInformation,investmentProfile,declared_source_of_wealth,portfolio"
+    ).split(",") if field.strip()
+)
+
+# Client profile data, resolved once at import
+CRM_DATA_PATH = Path(__file__).parent / "client_sample.json"
+
+
+@lru_cache(maxsize=1)
+def _load_client_data() -> dict:
+    """Load and parse the CRM profile once; later calls reuse it (raises FileNotFoundError if missing)."""
+    # Parsed from bytes with the C parser (orjson) when it is installed
+    return json_loads(CRM_DATA_PATH.read_bytes())
+
+# Client IDs are short alphanumeric keys; anything else can't match a CRM record
+_CLIENT_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+@validate_tool_arguments
+@memoize_per_conversation
 def load_from_crm_by_client_fullname(client_fullname: str) -> str:
     """
     Load client data from CRM by full name.
@@ -22,42 +52,18 @@ def load_from_crm_by_client_fullname(client_fullname: str) -> str:
     try:
         with tracing_manager.trace_function_call(
             "load_from_crm_by_client_fullname",
-            parameters={"client_fullname": client_fullname}
+            attributes={"client_fullname": client_fullname}
         ):
-            # Get the directory of the current script
-            script_dir = Path(__file__).parent
-            json_file_path = script_dir / "client_sample.json"
-        
-        # Check if the file exists
-        if not json_file_path.exists():
-            return json.dumps({"error": "CRM data file not found"})
-        
-        # Load the JSON data
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            client_data = json.load(file)
+            client_data = _load_client_data()
         
         # Check if the full name matches (case-insensitive)
         if client_data.get('fullName', '').lower() == client_fullname.lower():
             # Return the relevant client information
             result = {
                 "status": "success",
-                "client": {
-                    "id": client_data.get('id'),
-                    "clientID": client_data.get('clientID'),
-                    "fullName": client_data.get('fullName'),
-                    "firstName": client_data.get('firstName'),
-                    "lastName": client_data.get('lastName'),
-                    "dateOfBirth": client_data.get('dateOfBirth'),
-                    "nationality": client_data.get('nationality'),
-                    "contactDetails": client_data.get('contactDetails'),
-                    "address": client_data.get('address'),
-                    "financialInformation": client_data.get('financialInformation'),
-                    "investmentProfile": client_data.get('investmentProfile'),
-                    "declared_source_of_wealth": client_data.get('declared_source_of_wealth'),
-                    "portfolio": client_data.get('portfolio')
-                }
+                "client": {field: client_data.get(field) for field in CRM_PROFILE_FIELDS}
             }
-            return json.dumps(result, indent=2)
+            return json_dumps(result, indent=True)
         else:
             return json.dumps({"error": f"Client with full name '{client_fullname}' not found in CRM"})
             
@@ -70,12 +76,14 @@ def load_from_crm_by_client_fullname(client_fullname: str) -> str:
         if tracing_manager and tracing_manager.is_configured:
             with tracing_manager.trace_function_call(
                 "load_from_crm_by_client_fullname_error",
-                parameters={"error": str(e), "client_fullname": client_fullname}
+                attributes={"error": str(e), "client_fullname": client_fullname}
             ):
                 pass
         return json.dumps({"error": f"Error accessing CRM data: {str(e)}"})
 
 
+@validate_tool_arguments
+@memoize_per_conversation
 def load_from_crm_by_client_id(client_id: str) -> str:
     """
     Load client data from CRM by client ID.
@@ -86,47 +94,26 @@ def load_from_crm_by_client_id(client_id: str) -> str:
     Returns:
         str: JSON string containing client information or error message
     """
+    if not _CLIENT_ID_RE.fullmatch(client_id or ""):
+        return json.dumps({"error": f"Invalid client ID '{client_id}'"})
+
     tracing_manager = get_tracing_manager()
     
     try:
         with tracing_manager.trace_function_call(
             "load_from_crm_by_client_id",
-            parameters={"client_id": client_id}
+            attributes={"client_id": client_id}
         ):
-            # Get the directory of the current script
-            script_dir = Path(__file__).parent
-            json_file_path = script_dir / "client_sample.json"
-            
-            # Check if the file exists
-            if not json_file_path.exists():
-                return json.dumps({"error": "CRM data file not found"})
-        
-        # Load the JSON data
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            client_data = json.load(file)
+            client_data = _load_client_data()
         
         # Check if the client ID matches
         if client_data.get('clientID') == client_id or client_data.get('id') == client_id:
             # Return the relevant client information
             result = {
                 "status": "success",
-                "client": {
-                    "id": client_data.get('id'),
-                    "clientID": client_data.get('clientID'),
-                    "fullName": client_data.get('fullName'),
-                    "firstName": client_data.get('firstName'),
-                    "lastName": client_data.get('lastName'),
-                    "dateOfBirth": client_data.get('dateOfBirth'),
-                    "nationality": client_data.get('nationality'),
-                    "contactDetails": client_data.get('contactDetails'),
-                    "address": client_data.get('address'),
-                    "financialInformation": client_data.get('financialInformation'),
-                    "investmentProfile": client_data.get('investmentProfile'),
-                    "declared_source_of_wealth": client_data.get('declared_source_of_wealth'),
-                    "portfolio": client_data.get('portfolio')
-                }
+                "client": {field: client_data.get(field) for field in CRM_PROFILE_FIELDS}
             }
-            return json.dumps(result, indent=2)
+            return json_dumps(result, indent=True)
         else:
             return json.dumps({"error": f"Client with ID '{client_id}' not found in CRM"})
             
@@ -139,7 +126,7 @@ def load_from_crm_by_client_id(client_id: str) -> str:
         if tracing_manager and tracing_manager.is_configured:
             with tracing_manager.trace_function_call(
                 "load_from_crm_by_client_id_error",
-                parameters={"error": str(e), "client_id": client_id}
+                attributes={"error": str(e), "client_id": client_id}
             ):
                 pass
         return json.dumps({"error": f"Error accessing CRM data: {str(e)}"})
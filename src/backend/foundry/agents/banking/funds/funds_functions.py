@@ -3,19 +3,20 @@ Funds functions for accessing generic funds and ETFs information.
 This module provides AI Search capabilities for querying funds and ETFs data.
 """
 
-import os
 import json
 import logging
 from typing import Annotated
 from pathlib import Path
-from azure.search.documents import SearchClient
 from azure.search.documents.models import VectorizableTextQuery
-from azure.identity import DefaultAzureCredential
 
 # Import tracing utilities from backend root
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent))
 from tracing import get_tracing_manager
+from util import json_dumps
+from foundry.agents.tool_cache import memoize_per_conversation, ttl_cache
+from foundry.agents.search_clients import get_search_client, SearchToolConfig, SEARCH_SELECT_FIELDS, is_searchable_query, EMPTY_SEARCH_RESULT
+from foundry.agents.tool_schema_utils import validate_tool_arguments
 
 
 class FundsSearchFunctions:
@@ -26,28 +27,20 @@ class FundsSearchFunctions:
     
     def __init__(self):
         """Initialize the Funds Search Functions with Azure AI Search client."""
-        self.search_endpoint = os.getenv("AI_SEARCH_ENDPOINT")
-        self.search_index_name = os.getenv("AI_SEARCH_FUNDS_INDEX_NAME")
-        self.semantic_configuration_name = os.getenv("AI_SEARCH_FUNDS_SEMANTIC_CONFIGURATION", "default")
-        
-        if not self.search_endpoint or not self.search_index_name:
-            raise ValueError("AI_SEARCH_ENDPOINT and AI_SEARCH_FUNDS_INDEX_NAME environment variables are required")
-        
-        # Initialize Azure AI Search client with managed identity
-        self.search_client = SearchClient(
-            endpoint=self.search_endpoint,
-            index_name=self.search_index_name,
-            credential=DefaultAzureCredential(
-                exclude_environment_credential=True,
-                exclude_managed_identity_credential=True
-            )
+        self.config = SearchToolConfig.from_env(
+            "AI_SEARCH_FUNDS_INDEX_NAME",
+            "AI_SEARCH_FUNDS_SEMANTIC_CONFIGURATION",
+            vector_field_env="FUNDS_AI_SEARCH_VECTOR_FIELD_NAME"
         )
         
+        # Shared Azure AI Search client (one per index, reused across calls)
+        self.search_client = get_search_client(self.config.endpoint, self.config.index_name)
+        
         # Configure logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
-    def search_funds_details(self, query: Annotated[str, "The query to search for funds and ETFs information"]) -> Annotated[str, "The search results in JSON format"]:
+    async def search_funds_details(self, query: Annotated[str, "The query to search for funds and ETFs information"]) -> Annotated[str, "The search results in JSON format"]:
         """
         Search for generic funds and ETFs information including holdings, performances, sector exposures.
         
@@ -62,55 +55,44 @@ class FundsSearchFunctions:
         try:
             with tracing_manager.trace_function_call(
                 "search_funds_details",
-                parameters={
+                attributes={
                     "query": query,
-                    "search_endpoint": self.search_endpoint,
-                    "index_name": self.search_index_name
+                    "search_endpoint": self.config.endpoint,
+                    "index_name": self.config.index_name
                 }
             ):
                 # Create vector query for semantic search
                 text_vector_query = VectorizableTextQuery(
                     kind="text",
                     text=query,
-                    fields=os.getenv('FUNDS_AI_SEARCH_VECTOR_FIELD_NAME', "contentVector")
+                    fields=self.config.vector_field_name
                 )
 
-                # Perform semantic search with vector queries
-                results = self.search_client.search(
-                    search_text=query,
-                    include_total_count=True,
+                # Perform vector search (hybrid with semantic ranking if enabled)
+                results = await self.search_client.search(
+                    select=SEARCH_SELECT_FIELDS,
+                    include_total_count=False,
                     vector_queries=[text_vector_query],
-                    query_type="semantic",
-                    semantic_configuration_name=self.semantic_configuration_name,
-                    query_answer="extractive",
                     top=3,
-                    query_answer_count=3
+                    **self.config.query_options(query)
                 )
 
                 # Process search results
-                response = list(results)
-                output = []
-                
-                for result in response:
-                    # Remove internal fields from response
-                    result.pop("parent_id", None)
-                    result.pop("chunk_id", None)
-                    result.pop(os.getenv('FUNDS_AI_SEARCH_VECTOR_FIELD_NAME', "contentVector"), None)
-                    output.append(result)
+                output = [result async for result in results]
 
-                self.logger.info(f"Funds search completed for query: '{query}' - Found {len(output)} results")
-                return json.dumps(output, indent=2)
+                self.logger.info("Funds search completed for query: '%s' - Found %s results", query, len(output))
+                return json_dumps(output, indent=True)
             
         except Exception as e:
             # Log error in trace if available
             if tracing_manager and tracing_manager.is_configured:
                 with tracing_manager.trace_function_call(
                     "search_funds_details_error",
-                    parameters={"error": str(e), "query": query}
+                    attributes={"error": str(e), "query": query}
                 ):
                     pass
                     
-            self.logger.error(f"An unexpected error occurred in the 'search_funds_details' function of the 'funds_agent': {e}")
+            self.logger.error("An unexpected error occurred in the 'search_funds_details' function of the 'funds_agent': %s", e)
             return json.dumps({
                 "error": f"Search failed: {str(e)}",
                 "query": query,
@@ -129,9 +111,14 @@ def get_funds_search_functions():
     return _funds_search_functions
 
 # Function mapping for agent execution
-def search_funds_details(query: str) -> str:
+@validate_tool_arguments
+@memoize_per_conversation
+@ttl_cache(maxsize=1024, ttl=60)
+async def search_funds_details(query: str) -> str:
     """Wrapper function for agent execution."""
-    return get_funds_search_functions().search_funds_details(query)
+    if not is_searchable_query(query):
+        return EMPTY_SEARCH_RESULT
+    return await get_funds_search_functions().search_funds_details(query)
 
 # Export functions for agent registration
 funds_functions = [search_funds_details]
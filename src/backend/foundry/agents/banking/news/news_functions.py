@@ -3,23 +3,40 @@ News functions for fetching investment news from financial websites.
 This module provides web scraping capabilities for retrieving news related to stock positions.
 """
 
+import re
 import json
 import logging
-from typing import Annotated, Any, Callable
+from urllib.parse import quote
+from typing import Annotated, Any, Callable, Optional
 from pathlib import Path
 
-import pandas as pd
-from requests_html import HTMLSession
+import aiohttp
+import lxml.html
+from lxml import etree
 
 # Import tracing utilities from backend root
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent))
 from tracing import get_tracing_manager
+from util import json_dumps
+from foundry.agents.tool_cache import memoize_per_conversation, ttl_cache
+from foundry.agents.tool_schema_utils import validate_tool_arguments
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# finviz rejects requests without a browser-like user agent
+_REQUEST_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+_FINVIZ_URL = "https://finviz.com/quote.ashx?t={}"
+# Parser and XPath expressions are built once and reused for every page
+_HTML_PARSER = lxml.html.HTMLParser(remove_comments=True)
+_NEWS_TABLE_XPATH = etree.XPath("//table[contains(concat(' ', normalize-space(@class), ' '), ' fullview-news-outer ')]")
+# Stock tickers: 1-6 uppercase letters, dots or dashes (e.g. "BRK.B")
+_TICKER_RE = re.compile(r"[A-Z.\-]{1,6}")
+# The first cell holds "<date> <time>", or just "<time>" for further news of the same day
+_DATE_RE = re.compile(r"^(?:(\S+)\s+)?(\S+)$")
+
 
 class NewsSearchFunctions:
     """
@@ -29,10 +46,24 @@ class NewsSearchFunctions:
     
     def __init__(self):
         """Initialize the News Search Functions."""
-        self.session = HTMLSession()
-        self.base_url = "https://finviz.com/quote.ashx"
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use (must run inside the event loop)."""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                headers=_REQUEST_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+        return self.session
+
+    async def close(self):
+        """Close the shared HTTP session (and its connections), if one was opened."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
     
-    def fetch_news(
+    async def fetch_news(
         self, 
         position: Annotated[str, "The position (ticker) of the client's portfolio"]
     ) -> Annotated[str, "The output in JSON format"]:
@@ -50,23 +81,25 @@ class NewsSearchFunctions:
         try:
             with tracing_manager.trace_function_call(
                 "fetch_news",
-                parameters={
+                attributes={
                     "position": position,
                     "source": "finviz.com"
                 }
             ):
-                url = f'{self.base_url}?t={position}'
+                url = _FINVIZ_URL.format(quote(position, safe=''))
                 
-                response = self.session.get(url)
+                async with self._get_session().get(url) as response:
+                    response.raise_for_status()
+                    html = await response.text()
                 
                 # Find the news table
-                news_table = response.html.find('table.fullview-news-outer', first=True)
+                news_tables = _NEWS_TABLE_XPATH(lxml.html.fromstring(html, parser=_HTML_PARSER))
                 
                 # Check if the news_table was found
-                if news_table:
+                if news_tables:
                     # Find all news entries
-                    news_rows = news_table.find('tr')
-                    logger.info(f"Found {len(news_rows)} news entries for {position}.")
+                    news_rows = news_tables[0].xpath('.//tr')
+                    logger.info("Found %s news entries for %s.", len(news_rows), position)
                     
                     # List to store the news data
                     news_list = []
@@ -74,25 +107,24 @@ class NewsSearchFunctions:
 
                     # Extract data for the first 5 news entries
                     for i, row in enumerate(news_rows[:5]):  # Limit to first 5 entries
+                        cells = row.xpath('./td')
+                        if not cells:
+                            continue
+
                         # Extract date and time
-                        date_data = row.find('td', first=True).text.strip()
-                        date_parts = date_data.split()
-                        
-                        if len(date_parts) == 2:
+                        date_match = _DATE_RE.match(cells[0].text_content().strip())
+                        news_time = date_match.group(2) if date_match else None
+                        if date_match and date_match.group(1):
                             # Both date and time are provided
-                            news_date = date_parts[0]
-                            news_time = date_parts[1]
-                            last_date = news_date  # Update last_date
-                        else:
-                            # Only time is provided
-                            news_date = last_date
-                            news_time = date_parts[0]
+                            last_date = date_match.group(1)  # Update last_date
+                        # Only time is provided: the news is from the last seen date
+                        news_date = last_date
                         
                         # Extract headline and link
-                        headline_tag = row.find('a', first=True)
-                        if headline_tag:
-                            news_headline = headline_tag.text
-                            news_link = headline_tag.attrs.get('href', '')
+                        headline_tags = row.xpath('.//a')
+                        if headline_tags:
+                            news_headline = headline_tags[0].text_content().strip()
+                            news_link = headline_tags[0].get('href', '')
                             
                             # Append the news data to the list
                             news_list.append({
@@ -103,18 +135,16 @@ class NewsSearchFunctions:
                                 'Link': news_link
                             })
                     
-                    # Create a DataFrame for better visualization
-                    df = pd.DataFrame(news_list)
-                    logger.info(f"Retrieved {len(news_list)} news items for {position}")
+                    logger.info("Retrieved %s news items for %s", len(news_list), position)
                     
-                    return json.dumps({
+                    return json_dumps({
                         "status": "success",
                         "ticker": position,
                         "news_count": len(news_list),
                         "news": news_list
-                    }, indent=2)
+                    }, indent=True)
                 else:
-                    logger.warning(f"News table not found for {position}")
+                    logger.warning("News table not found for %s", position)
                     return json.dumps({
                         "status": "error",
                         "ticker": position,
@@ -123,7 +153,7 @@ class NewsSearchFunctions:
                     })
                     
         except Exception as e:
-            logger.error(f"An unexpected error occurred in fetch_news for '{position}': {e}")
+            logger.error("An unexpected error occurred in fetch_news for '%s': %s", position, e)
             return json.dumps({
                 "status": "error",
                 "ticker": position,
@@ -144,8 +174,17 @@ def get_news_search_functions():
     return _news_search_functions
 
 
+async def close_news_search_functions():
+    """Close the global news search functions instance, if it was created (call on shutdown)."""
+    if _news_search_functions is not None:
+        await _news_search_functions.close()
+
+
 # Wrapper function for agent execution
-def fetch_news(position: str) -> str:
+@validate_tool_arguments
+@memoize_per_conversation
+@ttl_cache(maxsize=1024, ttl=30)  # headlines update at most every minute
+async def fetch_news(position: str) -> str:
     """
     Wrapper function for agent execution.
     Fetches investment news for a specific stock ticker.
@@ -156,7 +195,16 @@ def fetch_news(position: str) -> str:
     Returns:
         JSON string containing news articles for the ticker
     """
-    return get_news_search_functions().fetch_news(position)
+    ticker = (position or "").strip().upper()
+    if not _TICKER_RE.fullmatch(ticker):
+        # Reject malformed tickers without a round-trip to finviz
+        return json.dumps({
+            "status": "error",
+            "ticker": position,
+            "error": "Invalid ticker symbol",
+            "news": []
+        })
+    return await get_news_search_functions().fetch_news(ticker)
 
 
 # Export functions for agent registration
@@ -3,16 +3,37 @@ Insurance CRM Functions for accessing client policy data and insurance informati
 This module provides functions to retrieve client insurance policy data from CRM.
 """
 
+import re
 import json
 from pathlib import Path
+from functools import lru_cache
 from typing import Any, Callable, Dict, Optional
 
 # Import tracing utilities from backend root
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent.parent.parent))
 from tracing import get_tracing_manager
+from util import json_dumps, json_loads
+from foundry.agents.tool_cache import memoize_per_conversation
+from foundry.agents.tool_schema_utils import validate_tool_arguments
 
+# Path: crm -> insurance -> agents -> foundry -> backend -> src -> data/customer-profiles
+# (resolved once at import)
+CRM_DATA_PATH = Path(__file__).parent.parent.parent.parent.parent.parent / "data" / "customer-profiles" / "customer-insurance.json"
 
+
+@lru_cache(maxsize=1)
+def _load_client_data() -> dict:
+    """Load and parse the insurance CRM profile once; later calls reuse it (raises FileNotFoundError if missing)."""
+    # Parsed from bytes with the C parser (orjson) when it is installed
+    return json_loads(CRM_DATA_PATH.read_bytes())
+
+# Client IDs are short alphanumeric keys; anything else can't match a CRM record
+_CLIENT_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+@validate_tool_arguments
+@memoize_per_conversation
 def load_insurance_client_by_fullname(client_fullname: str) -> str:
     """
     Load insurance client data from CRM by full name.
@@ -28,20 +49,9 @@ def load_insurance_client_by_fullname(client_fullname: str) -> str:
     try:
         with tracing_manager.trace_function_call(
             "load_insurance_client_by_fullname",
-            parameters={"client_fullname": client_fullname}
+            attributes={"client_fullname": client_fullname}
         ):
-            # Get the path to the insurance customer data
-            # Path: crm -> insurance -> agents -> foundry -> backend -> src -> data/customer-profiles
-            data_dir = Path(__file__).parent.parent.parent.parent.parent.parent / "data" / "customer-profiles"
-            json_file_path = data_dir / "customer-insurance.json"
-        
-            # Check if the file exists
-            if not json_file_path.exists():
-                return json.dumps({"error": "Insurance CRM data file not found"})
-            
-            # Load the JSON data
-            with open(json_file_path, 'r', encoding='utf-8') as file:
-                client_data = json.load(file)
+            client_data = _load_client_data()
             
             # Check if the full name matches (case-insensitive)
             if client_data.get('fullName', '').lower() == client_fullname.lower():
@@ -61,7 +71,7 @@ def load_insurance_client_by_fullname(client_fullname: str) -> str:
                         "policies": client_data.get('policies', [])
                     }
                 }
-                return json.dumps(result, indent=2)
+                return json_dumps(result, indent=True)
             else:
                 return json.dumps({"error": f"Insurance client with full name '{client_fullname}' not found in CRM"})
             
@@ -74,12 +84,14 @@ def load_insurance_client_by_fullname(client_fullname: str) -> str:
         if tracing_manager and tracing_manager.is_configured:
             with tracing_manager.trace_function_call(
                 "load_insurance_client_by_fullname_error",
-                parameters={"error": str(e), "client_fullname": client_fullname}
+                attributes={"error": str(e), "client_fullname": client_fullname}
             ):
                 pass
         return json.dumps({"error": f"Error accessing Insurance CRM data: {str(e)}"})
 
 
+@validate_tool_arguments
+@memoize_per_conversation
 def load_insurance_client_by_id(client_id: str) -> str:
     """
     Load insurance client data from CRM by client ID.
@@ -90,25 +102,17 @@ def load_insurance_client_by_id(client_id: str) -> str:
     Returns:
         str: JSON string containing client insurance information or error message
     """
+    if not _CLIENT_ID_RE.fullmatch(client_id or ""):
+        return json.dumps({"error": f"Invalid insurance client ID '{client_id}'"})
+
     tracing_manager = get_tracing_manager()
     
     try:
         with tracing_manager.trace_function_call(
             "load_insurance_client_by_id",
-            parameters={"client_id": client_id}
+            attributes={"client_id": client_id}
         ):
-            # Get the path to the insurance customer data
-            # Path: crm -> insurance -> agents -> foundry -> backend -> src -> data/customer-profiles
-            data_dir = Path(__file__).parent.parent.parent.parent.parent.parent / "data" / "customer-profiles"
-            json_file_path = data_dir / "customer-insurance.json"
-            
-            # Check if the file exists
-            if not json_file_path.exists():
-                return json.dumps({"error": "Insurance CRM data file not found"})
-        
-            # Load the JSON data
-            with open(json_file_path, 'r', encoding='utf-8') as file:
-                client_data = json.load(file)
+            client_data = _load_client_data()
             
             # Check if the client ID matches
             if client_data.get('clientID') == client_id or client_data.get('id') == client_id:
@@ -128,7 +132,7 @@ def load_insurance_client_by_id(client_id: str) -> str:
                         "policies": client_data.get('policies', [])
                     }
                 }
-                return json.dumps(result, indent=2)
+                return json_dumps(result, indent=True)
             else:
                 return json.dumps({"error": f"Insurance client with ID '{client_id}' not found in CRM"})
             
@@ -141,12 +145,14 @@ def load_insurance_client_by_id(client_id: str) -> str:
         if tracing_manager and tracing_manager.is_configured:
             with tracing_manager.trace_function_call(
                 "load_insurance_client_by_id_error",
-                parameters={"error": str(e), "client_id": client_id}
+                attributes={"error": str(e), "client_id": client_id}
             ):
                 pass
         return json.dumps({"error": f"Error accessing Insurance CRM data: {str(e)}"})
 
 
+@validate_tool_arguments
+@memoize_per_conversation
 def get_client_policy_details(client_id: str, policy_no: str) -> str:
     """
     Get details for a specific policy of an insurance client.
@@ -158,25 +164,17 @@ def get_client_policy_details(client_id: str, policy_no: str) -> str:
     Returns:
         str: JSON string containing policy details or error message
     """
+    if not _CLIENT_ID_RE.fullmatch(client_id or ""):
+        return json.dumps({"error": f"Invalid insurance client ID '{client_id}'"})
+
     tracing_manager = get_tracing_manager()
     
     try:
         with tracing_manager.trace_function_call(
             "get_client_policy_details",
-            parameters={"client_id": client_id, "policy_no": policy_no}
+            attributes={"client_id": client_id, "policy_no": policy_no}
         ):
-            # Get the path to the insurance customer data
-            # Path: crm -> insurance -> agents -> foundry -> backend -> src -> data/customer-profiles
-            data_dir = Path(__file__).parent.parent.parent.parent.parent.parent / "data" / "customer-profiles"
-            json_file_path = data_dir / "customer-insurance.json"
-            
-            # Check if the file exists
-            if not json_file_path.exists():
-                return json.dumps({"error": "Insurance CRM data file not found"})
-        
-            # Load the JSON data
-            with open(json_file_path, 'r', encoding='utf-8') as file:
-                client_data = json.load(file)
+            client_data = _load_client_data()
             
             # Check if the client ID matches
             if client_data.get('clientID') != client_id and client_data.get('id') != client_id:
@@ -194,7 +192,7 @@ def get_client_policy_details(client_id: str, policy_no: str) -> str:
                         },
                         "policy": policy
                     }
-                    return json.dumps(result, indent=2)
+                    return json_dumps(result, indent=True)
             
             return json.dumps({"error": f"Policy number '{policy_no}' not found for client '{client_id}'"})
             
@@ -207,7 +205,7 @@ def get_client_policy_details(client_id: str, policy_no: str) -> str:
         if tracing_manager and tracing_manager.is_configured:
             with tracing_manager.trace_function_call(
                 "get_client_policy_details_error",
-                parameters={"error": str(e), "client_id": client_id, "policy_no": policy_no}
+                attributes={"error": str(e), "client_id": client_id, "policy_no": policy_no}
             ):
                 pass
         return json.dumps({"error": f"Error accessing Insurance CRM data: {str(e)}"})
@@ -30,6 +30,8 @@ class InsurancePoliciesSearchFunctions:
         self.search_index_name = os.getenv("AI_SEARCH_INS_INDEX_NAME")
         self.semantic_configuration_name = os.getenv("AI_SEARCH_INS_SEMANTIC_CONFIGURATION", "default")
         self.vector_field_name = os.getenv("AI_SEARCH_VECTOR_FIELD_NAME", "contentVector")
+        # Internal fields stripped from each search result
+        self._drop_fields = frozenset({"parent_id", "chunk_id", self.vector_field_name})
         
         if not self.search_endpoint or not self.search_index_name:
             raise ValueError("AI_SEARCH_ENDPOINT and AI_SEARCH_INS_INDEX_NAME environment variables are required")
@@ -63,7 +65,7 @@ class InsurancePoliciesSearchFunctions:
         try:
             with tracing_manager.trace_function_call(
                 "search_insurance_policies",
-                parameters={
+                attributes={
                     "query": query,
                     "search_endpoint": self.search_endpoint,
                     "index_name": self.search_index_name
@@ -88,18 +90,13 @@ class InsurancePoliciesSearchFunctions:
                     query_answer_count=3
                 )
 
-                # Process search results
-                response = list(results)
-                output = []
-                
-                for result in response:
-                    # Remove internal fields from response
-                    result.pop("parent_id", None)
-                    result.pop("chunk_id", None)
-                    result.pop(self.vector_field_name, None)
-                    output.append(result)
+                # Process search results in a single pass, dropping internal fields
+                output = [
+                    {key: value for key, value in result.items() if key not in self._drop_fields}
+                    for result in results
+                ]
 
-                self.logger.info(f"Insurance policies search completed for query: '{query}' - Found {len(output)} results")
+                self.logger.info("Insurance policies search completed for query: '%s' - Found %s results", query, len(output))
                 return json.dumps(output, indent=2)
             
         except Exception as e:
@@ -107,11 +104,11 @@ class InsurancePoliciesSearchFunctions:
             if tracing_manager and tracing_manager.is_configured:
                 with tracing_manager.trace_function_call(
                     "search_insurance_policies_error",
-                    parameters={"error": str(e), "query": query}
+                    attributes={"error": str(e), "query": query}
                 ):
                     pass
                     
-            self.logger.error(f"An unexpected error occurred in the 'search_insurance_policies' function: {e}")
+            self.logger.error("An unexpected error occurred in the 'search_insurance_policies' function: %s", e)
             return json.dumps({
                 "error": f"Search failed: {str(e)}",
                 "query": query,
@@ -0,0 +1,122 @@
+"""
+Shared Azure AI Search clients for the agent tools.
+
+Building a SearchClient (and its credential) is comparatively expensive: it
+sets up a new HTTP pipeline and connection pool and acquires a fresh token.
+The tools therefore share one client per index, authenticated with the
+app-wide credential from util. Both are the async variants so searches are
+awaited on the event loop instead of blocking it.
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+from azure.search.documents.aio import SearchClient
+
+from util import get_async_azure_credential
+
+# Fields returned to the agents; projecting server-side keeps the (large) vector
+# field and internal ids off the wire instead of stripping them client-side.
+SEARCH_SELECT_FIELDS = [
+    field.strip() for field in os.getenv("AI_SEARCH_SELECT_FIELDS", "title,chunk").split(",") if field.strip()
+]
+
+
+# Shorter (or blank) queries are answered with no results instead of a search round-trip
+MIN_QUERY_LENGTH = 3
+EMPTY_SEARCH_RESULT = "[]"
+
+
+def is_searchable_query(query: str | None) -> bool:
+    """Whether a query is worth sending to Azure AI Search."""
+    return len((query or "").strip()) >= MIN_QUERY_LENGTH
+
+
+@dataclass(frozen=True, slots=True)
+class SearchToolConfig:
+    """Azure AI Search settings of a search tool, resolved and validated once."""
+    endpoint: str
+    index_name: str
+    semantic_configuration_name: str
+    vector_field_name: str
+    use_semantic: bool = False
+
+    @classmethod
+    def from_env(
+        cls,
+        index_name_env: str,
+        semantic_configuration_env: str,
+        vector_field_env: str | None = None,
+        default_vector_field: str = "contentVector"
+    ) -> "SearchToolConfig":
+        """
+        Build the configuration from environment variables.
+
+        Args:
+            index_name_env: Environment variable holding the index name
+            semantic_configuration_env: Environment variable holding the semantic configuration name
+            vector_field_env: Environment variable holding the vector field name (optional)
+            default_vector_field: Vector field name used when not configured
+
+        Returns:
+            SearchToolConfig instance
+
+        Raises:
+            ValueError: If the endpoint or index name is not configured
+        """
+        endpoint = os.getenv("AI_SEARCH_ENDPOINT")
+        index_name = os.getenv(index_name_env)
+        if not endpoint or not index_name:
+            raise ValueError(f"AI_SEARCH_ENDPOINT and {index_name_env} environment variables are required")
+
+        return cls(
+            endpoint=endpoint,
+            index_name=index_name,
+            semantic_configuration_name=os.getenv(semantic_configuration_env, "default"),
+            vector_field_name=os.getenv(vector_field_env, default_vector_field) if vector_field_env else default_vector_field,
+            use_semantic=os.getenv("AI_SEARCH_USE_SEMANTIC", "false").lower() in ("true", "1", "yes")
+        )
+
+    def query_options(self, query: str) -> dict:
+        """
+        Get the search options for a query.
+
+        By default the tools run a pure vector search, which skips the semantic
+        (L2) re-ranker and its extra latency; set AI_SEARCH_USE_SEMANTIC=true for
+        hybrid search with semantic ranking and extractive answers.
+
+        Args:
+            query: The user query
+
+        Returns:
+            Keyword arguments for SearchClient.search (besides the vector queries)
+        """
+        if not self.use_semantic:
+            return {"search_text": None}
+        return {
+            "search_text": query,
+            "query_type": "semantic",
+            "semantic_configuration_name": self.semantic_configuration_name,
+            "query_answer": "extractive",
+            "query_answer_count": 3
+        }
+
+
+@lru_cache(maxsize=None)
+def get_search_client(endpoint: str, index_name: str) -> SearchClient:
+    """
+    Get the shared SearchClient for an index.
+
+    Args:
+        endpoint: Azure AI Search endpoint
+        index_name: Name of the search index
+
+    Returns:
+        Async SearchClient instance reused across calls
+    """
+    return SearchClient(
+        endpoint=endpoint,
+        index_name=index_name,
+        credential=get_async_azure_credential()
+    )
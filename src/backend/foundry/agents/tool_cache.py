@@ -0,0 +1,182 @@
+"""
+Caching utilities for read-only agent tools.
+
+Agents frequently repeat the same lookup within one conversation turn (e.g. the
+coordinator and a specialist both loading the same client profile). Tools that
+only read data can be wrapped with `memoize_per_conversation` so identical
+invocations inside a `conversation_memo()` scope reuse the first result.
+
+Tools over slowly changing, user-independent data (research documents, fund
+information, news headlines) can additionally be wrapped with `ttl_cache` to
+share results across conversations for a short time.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+# Memo of the conversation currently being processed (None outside a scope)
+_conversation_memo: ContextVar[Optional[dict]] = ContextVar("conversation_memo", default=None)
+
+
+@contextmanager
+def conversation_memo():
+    """
+    Open a memoization scope for one conversation.
+
+    Tasks spawned inside the scope inherit it, so tool calls executed by the
+    workflow share the same memo.
+    """
+    token = _conversation_memo.set({})
+    try:
+        yield
+    finally:
+        _conversation_memo.reset(token)
+
+
+def _memo_key(func: Callable, args: tuple, kwargs: dict) -> tuple:
+    """Build a memo key from the function name and its call arguments."""
+    return (func.__name__, json.dumps([args, kwargs], sort_keys=True, default=str))
+
+
+def memoize_per_conversation(func: Callable) -> Callable:
+    """
+    Memoize a read-only tool within the current conversation scope.
+
+    Works for sync and async tools; outside a `conversation_memo()` scope the
+    tool is called normally. Error responses are not memoized.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            memo = _conversation_memo.get()
+            if memo is None:
+                return await func(*args, **kwargs)
+            key = _memo_key(func, args, kwargs)
+            future = memo.get(key)
+            if future is None:
+                # Store the in-flight future so concurrent identical calls share it
+                future = memo[key] = asyncio.ensure_future(func(*args, **kwargs))
+            try:
+                result = await asyncio.shield(future)
+            except Exception:
+                _forget(memo, key, future)
+                raise
+            if is_error_response(result):
+                # Errors may be transient: the next identical call tries again
+                _forget(memo, key, future)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        memo = _conversation_memo.get()
+        if memo is None:
+            return func(*args, **kwargs)
+        key = _memo_key(func, args, kwargs)
+        if key in memo:
+            return memo[key]
+        result = func(*args, **kwargs)
+        if not is_error_response(result):
+            memo[key] = result
+        return result
+    return wrapper
+
+
+def _forget(memo: dict, key: tuple, future: asyncio.Future):
+    """Drop a memoized call, unless a newer call already replaced it."""
+    if memo.get(key) is future:
+        del memo[key]
+
+
+def is_error_response(result: Any) -> bool:
+    """
+    Whether a tool's JSON string result reports an error (errors are never cached).
+
+    Errors are JSON objects with a top-level "error" key or "status": "error",
+    however they were serialized (compact or not, any key order). Only results
+    mentioning "error" at all are parsed.
+    """
+    if not isinstance(result, str) or '"error"' not in result:
+        return False
+    try:
+        payload = json.loads(result)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and ("error" in payload or payload.get("status") == "error")
+
+
+def _normalize_arg(value: Any) -> Any:
+    """Normalize a string argument so trivially different queries share a cache entry."""
+    return " ".join(value.lower().split()) if isinstance(value, str) else value
+
+
+def ttl_cache(maxsize: int = 1024, ttl: float = 60) -> Callable[[Callable], Callable]:
+    """
+    Cache a tool's results across conversations in a bounded LRU with a time-to-live.
+
+    String arguments are normalized (case and whitespace) to build the key, and
+    error responses are not cached.
+
+    Args:
+        maxsize: Maximum number of cached results (least recently used evicted first)
+        ttl: Seconds a cached result stays valid
+    """
+    def decorator(func: Callable) -> Callable:
+        cache: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+
+        def make_key(args: tuple, kwargs: dict) -> tuple:
+            return (
+                tuple(_normalize_arg(a) for a in args),
+                tuple(sorted((k, _normalize_arg(v)) for k, v in kwargs.items()))
+            )
+
+        def lookup(key: tuple) -> tuple[bool, Any]:
+            entry = cache.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.monotonic():
+                del cache[key]
+                return False, None
+            cache.move_to_end(key)
+            return True, entry[1]
+
+        def store(key: tuple, result: Any):
+            if is_error_response(result):
+                return
+            cache[key] = (time.monotonic() + ttl, result)
+            cache.move_to_end(key)
+            while len(cache) > maxsize:
+                cache.popitem(last=False)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                hit, result = lookup(key)
+                if hit:
+                    return result
+                result = await func(*args, **kwargs)
+                store(key, result)
+                return result
+            async_wrapper.cache_clear = cache.clear
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            hit, result = lookup(key)
+            if hit:
+                return result
+            result = func(*args, **kwargs)
+            store(key, result)
+            return result
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
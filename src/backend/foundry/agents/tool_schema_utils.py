@@ -11,6 +11,7 @@ Agent Framework.
 
 import inspect
 import json
+from functools import lru_cache, wraps
 from typing import Any, Callable, get_type_hints, Annotated
 from azure.ai.projects.models import FunctionTool
 
@@ -92,9 +93,13 @@ def extract_annotated_description(annotation) -> tuple[type, str | None]:
     return annotation, None
 
 
+@lru_cache(maxsize=None)
 def function_to_tool_schema(func: Callable) -> FunctionTool:
     """
     Convert a Python function to a FunctionTool schema for Foundry registration.
+
+    Tool functions are static for the process lifetime, so each schema is built
+    once and reused on subsequent calls.
     
     Args:
         func: The Python function to convert
@@ -219,6 +224,80 @@ def extract_param_description_from_docstring(docstring: str, param_name: str) ->
     return None
 
 
+_JSON_TYPE_CHECKS = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+}
+
+
+def find_tool_argument_errors(func: Callable, args: tuple, kwargs: dict) -> list[str]:
+    """
+    Validate call arguments against the function's tool schema.
+    
+    Args:
+        func: The tool function
+        args: Positional call arguments
+        kwargs: Keyword call arguments
+        
+    Returns:
+        List of validation error messages (empty if the arguments are valid)
+    """
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+    except TypeError as e:
+        return [str(e)]
+    
+    parameters = function_to_tool_schema(func).parameters
+    required = set(parameters.get("required", []))
+    errors = []
+    for name, value in bound.arguments.items():
+        expected = parameters["properties"].get(name, {}).get("type")
+        check = _JSON_TYPE_CHECKS.get(expected)
+        if check and not check(value):
+            errors.append(f"'{name}' must be of type {expected}")
+        elif name in required and isinstance(value, str) and not value.strip():
+            errors.append(f"'{name}' must not be empty")
+    return errors
+
+
+def validate_tool_arguments(func: Callable) -> Callable:
+    """
+    Decorator that validates tool arguments against the tool schema before calling it.
+    
+    Invalid calls short-circuit with a JSON error string the model can act on,
+    instead of issuing a search/CRM request with bad inputs.
+    
+    Args:
+        func: The tool function (sync or async) returning a JSON string
+        
+    Returns:
+        The wrapped tool function
+    """
+    def error_response(errors: list[str]) -> str:
+        return json.dumps({"error": f"Invalid arguments for {func.__name__}: {'; '.join(errors)}"})
+    
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            errors = find_tool_argument_errors(func, args, kwargs)
+            if errors:
+                return error_response(errors)
+            return await func(*args, **kwargs)
+        return async_wrapper
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        errors = find_tool_argument_errors(func, args, kwargs)
+        if errors:
+            return error_response(errors)
+        return func(*args, **kwargs)
+    return wrapper
+
+
 def functions_to_tool_schemas(functions: list[Callable]) -> list[FunctionTool]:
     """
     Convert a list of Python functions to FunctionTool schemas.
@@ -232,6 +311,66 @@ def functions_to_tool_schemas(functions: list[Callable]) -> list[FunctionTool]:
     return [function_to_tool_schema(func) for func in functions]
 
 
+_DOCSTRING_TRAILING_SECTIONS = ("returns:", "raises:", "yields:", "examples:", "example:", "note:", "notes:")
+
+
+def tool_description(func: Callable) -> str:
+    """
+    Build the model-facing description of a tool from its docstring.
+
+    The description is sent with every model call, so it keeps only the summary
+    and the Args section: no indentation, blank lines or Returns/Raises sections.
+
+    Args:
+        func: The tool function
+
+    Returns:
+        Compact tool description
+    """
+    docstring = inspect.getdoc(func) or f"Function {func.__name__}"
+    lines = []
+    for line in docstring.split("\n"):
+        stripped = line.strip()
+        if stripped.lower() in _DOCSTRING_TRAILING_SECTIONS:
+            break
+        if stripped:
+            lines.append(line.rstrip())
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=None)
+def function_to_ai_function(func: Callable):
+    """
+    Wrap a tool function as an AIFunction with a compact description.
+
+    agent_framework otherwise advertises the raw docstring of plain functions.
+
+    Args:
+        func: The tool function
+
+    Returns:
+        AIFunction instance (built once per function)
+    """
+    from agent_framework import ai_function
+
+    return ai_function(func, description=tool_description(func))
+
+
+def functions_to_ai_functions(functions: list[Callable] | None) -> list | None:
+    """
+    Wrap a list of tool functions as AIFunctions with compact descriptions.
+
+    Args:
+        functions: List of tool functions (or None for agents without tools)
+
+    Returns:
+        List of AIFunction instances, or None
+    """
+    if not functions:
+        return functions
+    return [function_to_ai_function(func) for func in functions]
+
+
 def create_handoff_tool_schemas(agent_names: list[str]) -> list[FunctionTool]:
     """
     Create FunctionTool schemas for handoff tools.
@@ -1,8 +1,9 @@
+import asyncio
 import logging
-import json
 import os
+import weakref
 
-
+from util import json_dumps
 from foundry.orchestrators.deep_research_orchestrator import DeepResearchOrchestrator
 # Foundry orchestrators (hosted agents)
 from foundry.orchestrators.foundry_banking_orchestrator import FoundryBankingOrchestrator
@@ -11,6 +12,35 @@ from foundry.orchestrators.foundry_insurance_orchestrator import FoundryInsuranc
 from foundry.orchestrators.open_ai_banking_orchestrator import OpenAIBankingOrchestrator
 from foundry.orchestrators.open_ai_insurance_orchestrator import OpenAIInsuranceOrchestrator
 
+# Follow-up turns are written in the background after the reply is returned
+# (a new chat is written before its id is handed out).
+# Tasks still in flight are awaited on shutdown, and writes for one user are
+# serialized so appends land in order (locks are dropped once no one holds them).
+_pending_writes: set[asyncio.Task] = set()
+_last_user_write: dict[str, asyncio.Task] = {}
+_user_write_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+# Streamed requests run in their own task, kept referenced until they finish
+_pending_requests: set[asyncio.Task] = set()
+
+
+def _user_write_lock(user_id) -> asyncio.Lock:
+    lock = _user_write_locks.get(user_id)
+    if lock is None:
+        lock = _user_write_locks[user_id] = asyncio.Lock()
+    return lock
+
+
+async def wait_for_pending_writes(user_id=None):
+    """Wait until pending conversation writes (of one user, or all) are persisted."""
+    if user_id is None:
+        if _pending_writes:
+            await asyncio.gather(*_pending_writes, return_exceptions=True)
+        return
+    # Writes of a user run in order, so waiting for the latest one is enough
+    task = _last_user_write.get(user_id)
+    if task is not None:
+        await asyncio.wait([task])
+
 
 class Handler:
     def __init__(self, history_db, use_foundry: bool = None):
@@ -26,30 +56,50 @@ class Handler:
         else:
             self.use_foundry = use_foundry
         
+        # Orchestrators are built on first use: a handler serves one use case
+        # container, so the others (and deep research) may never be needed
         self.orchestrators = {}
         
         # Select orchestrator based on USE_FOUNDRY setting
         if self.use_foundry:
             # Use Foundry orchestrators (hosted agents in Microsoft Foundry)
-            self.orchestrators['fsi_insurance'] = FoundryInsuranceOrchestrator()
-            self.logger.info("Using FoundryInsuranceOrchestrator for fsi_insurance (Foundry hosted agents)")
-            
-            self.orchestrators['fsi_banking'] = FoundryBankingOrchestrator()
-            self.logger.info("Using FoundryBankingOrchestrator for fsi_banking (Foundry hosted agents)")
+            self._orchestrator_factories = {
+                'fsi_insurance': FoundryInsuranceOrchestrator,
+                'fsi_banking': FoundryBankingOrchestrator,
+            }
         else:
             # Use OpenAI orchestrators (in-memory agents with Azure OpenAI)
-            self.orchestrators['fsi_insurance'] = OpenAIInsuranceOrchestrator()
-            self.logger.info("Using OpenAIInsuranceOrchestrator for fsi_insurance (Azure OpenAI in-memory agents)")
-            
-            self.orchestrators['fsi_banking'] = OpenAIBankingOrchestrator()
-            self.logger.info("Using OpenAIBankingOrchestrator for fsi_banking (Azure OpenAI in-memory agents)")
+            self._orchestrator_factories = {
+                'fsi_insurance': OpenAIInsuranceOrchestrator,
+                'fsi_banking': OpenAIBankingOrchestrator,
+            }
+        self._orchestrator_factories['deep_research'] = DeepResearchOrchestrator
         
-        self.logger.info(f"Handler initialized with USE_FOUNDRY={self.use_foundry}")
-
-        self.orchestrators['deep_research'] = DeepResearchOrchestrator()
-
-    def load_history(self, user_id):
-        user_data = self.history_db.read_user_info(user_id)
+        self.logger.info("Handler initialized with USE_FOUNDRY=%s", self.use_foundry)
+
+    def get_orchestrator(self, name):
+        """Get the orchestrator for a use case, creating it on first use."""
+        orchestrator = self.orchestrators.get(name)
+        if orchestrator is None:
+            orchestrator = self.orchestrators[name] = self._orchestrator_factories[name]()
+            self.logger.info("Using %s for %s", type(orchestrator).__name__, name)
+        return orchestrator
+
+    async def warmup(self, usecase_types=None):
+        """Set up the conversation store and the orchestrators of the given use cases (default: all)."""
+        orchestrators = [
+            self.get_orchestrator(usecase_type)
+            for usecase_type in (usecase_types or self._orchestrator_factories)
+        ]
+        await asyncio.gather(
+            self.history_db.initialize(),
+            *(orchestrator.warmup() for orchestrator in orchestrators if hasattr(orchestrator, 'warmup'))
+        )
+
+    async def load_history(self, user_id, user_data=None):
+        # Reuse the user document the caller already read, if any
+        if user_data is None:
+            user_data = await self.history_db.read_user_info(user_id)
         conversation_list = []
         chat_histories = user_data.get('chat_histories')
         if chat_histories:
@@ -60,51 +110,104 @@ class Handler:
                     "messages": messages
                 }
                 conversation_list.append(conversation_object)
-        self.logger.info(f"user history: {json.dumps(conversation_list)}")
+        self.logger.info("user history: %d conversations", len(conversation_list))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("user history: %s", json_dumps(conversation_list))
         return {"status_code": 200, "data": conversation_list}
 
 
-    async def handle_request(self, user_id, chat_id, user_message, load_history, usecase_type, user_data, is_deep_research):
+    async def handle_request(self, user_id, chat_id, user_message, load_history, usecase_type, user_data, is_deep_research, on_delta=None):
         # Additional Use Case - load history
         if load_history is True:
-            return self.load_history(user_id=user_id)
+            return await self.load_history(user_id=user_id, user_data=user_data)
 
         # CORE use case
         conversation_messages = []
 
         # Continue existing chat if chat_id is provided
+        is_new_chat = not chat_id
         if chat_id:
             conversation_data = user_data.get('chat_histories', {}).get(chat_id)
-            self.logger.debug(f"Conversation data={conversation_data}")
+            self.logger.debug("Conversation data=%s", conversation_data)
             if conversation_data:
                 conversation_messages = conversation_data.get('messages', [])
             else:
                 return {"status_code": 404, "error": "chat_id not found"}
         else:
-            # Start a new chat
-            chat_id = self.history_db.generate_chat_id()
+            # Start a new chat (persisted together with the first reply)
+            chat_id = self.history_db.generate_chat_id(user_data.get('chat_histories') or {})
             conversation_messages = []
-            user_data.setdefault('chat_histories', {})
-            user_data['chat_histories'][chat_id] = {'messages': conversation_messages}
-            self.history_db.update_user_info(user_id, user_data)
 
         # Append user message
-        conversation_messages.append({'role': 'user', 'name': 'user', 'content': user_message})
+        user_entry = {'role': 'user', 'name': 'user', 'content': user_message}
+        conversation_messages.append(user_entry)
 
-        if not usecase_type in self.orchestrators: 
+        if not usecase_type in self._orchestrator_factories: 
             return {"status_code": 400, "error": "Use case not recognized"}
         
         #TODO not elegant..
         if is_deep_research:
-            orchestrator = self.orchestrators['deep_research']
+            orchestrator = self.get_orchestrator('deep_research')
         else:
-            orchestrator = self.orchestrators[usecase_type]
-        reply = await orchestrator.process_conversation(user_id, conversation_messages, session_id=chat_id)
+            orchestrator = self.get_orchestrator(usecase_type)
+        reply = await orchestrator.process_conversation(user_id, conversation_messages, session_id=chat_id, on_delta=on_delta)
 
         # Store updated conversation
         conversation_messages.append(reply)
-        user_data['chat_histories'][chat_id] = {'messages': conversation_messages}
-
-        self.history_db.update_user_info(user_id, user_data)
+        user_data.setdefault('chat_histories', {})[chat_id] = {'messages': conversation_messages}
+
+        if is_new_chat:
+            # The client only learns the chat_id from this reply, so the chat must
+            # exist before it is handed out (later turns would get "chat_id not found")
+            try:
+                async with _user_write_lock(user_id):
+                    await self.history_db.add_chat(user_id, chat_id, conversation_messages)
+            except Exception:
+                self.logger.exception("Failed to persist new chat for user %s", user_id)
+                user_data['chat_histories'].pop(chat_id, None)
+                return {"status_code": 500, "error": "Failed to save the new chat"}
+        else:
+            # Persist in the background (write-behind) so the reply isn't held up by Cosmos
+            self._persist_in_background(user_id, self.history_db.append_messages, chat_id, [user_entry, reply])
 
         return {"status_code": 200, "chat_id": chat_id, "reply": [reply]}
+
+    async def handle_request_stream(self, **request):
+        """
+        Handle a request like `handle_request`, yielding the reply while it is generated.
+
+        Yields ("delta", {"name": agent, "content": text}) items as the agents stream
+        text, then ("result", result) with the same result `handle_request` returns.
+        The request keeps running (and is persisted) if the caller stops listening.
+        """
+        deltas = asyncio.Queue()
+        task = asyncio.create_task(self.handle_request(
+            **request,
+            on_delta=lambda name, text: deltas.put_nowait({"name": name, "content": text})
+        ))
+        _pending_requests.add(task)
+        task.add_done_callback(_pending_requests.discard)
+        # Wake the consumer once the request is done (after any remaining deltas)
+        task.add_done_callback(lambda _: deltas.put_nowait(None))
+
+        while (delta := await deltas.get()) is not None:
+            yield "delta", delta
+        yield "result", task.result()
+
+    def _persist_in_background(self, user_id, write, *args):
+        task = asyncio.create_task(self._persist(_user_write_lock(user_id), user_id, write, *args))
+        _pending_writes.add(task)
+        _last_user_write[user_id] = task
+
+        def forget(done_task):
+            _pending_writes.discard(done_task)
+            if _last_user_write.get(user_id) is done_task:
+                del _last_user_write[user_id]
+        task.add_done_callback(forget)
+
+    async def _persist(self, lock, user_id, write, *args):
+        async with lock:
+            try:
+                await write(user_id, *args)
+            except Exception:
+                self.logger.exception("Failed to persist conversation for user %s", user_id)
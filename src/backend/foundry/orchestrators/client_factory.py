@@ -0,0 +1,49 @@
+"""
+Shared LLM clients for the orchestrators.
+
+The banking and insurance orchestrators talk to the same Azure OpenAI endpoint
+and deployment, so they share one chat client (and its connection pool and
+credential) instead of each building their own.
+"""
+
+import os
+import logging
+from functools import lru_cache
+
+from agent_framework.azure import AzureOpenAIChatClient
+
+from util import get_azure_credential
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_azure_openai_chat_client(endpoint: str, deployment_name: str) -> AzureOpenAIChatClient:
+    """
+    Get the process-wide Azure OpenAI chat client for an endpoint/deployment.
+
+    Uses AZURE_OPENAI_KEY if provided, otherwise falls back to DefaultAzureCredential.
+
+    Args:
+        endpoint: Azure OpenAI endpoint URL
+        deployment_name: Chat model deployment name
+
+    Returns:
+        Shared AzureOpenAIChatClient instance
+    """
+    api_key = os.getenv("AZURE_OPENAI_KEY")
+
+    if api_key:
+        logger.info("Using API key authentication for Azure OpenAI")
+        return AzureOpenAIChatClient(
+            endpoint=endpoint,
+            deployment_name=deployment_name,
+            api_key=api_key
+        )
+
+    logger.info("Using DefaultAzureCredential for Azure OpenAI")
+    return AzureOpenAIChatClient(
+        endpoint=endpoint,
+        deployment_name=deployment_name,
+        credential=get_azure_credential()
+    )
@@ -1,25 +1,54 @@
 import os
+import re
 import math
 import asyncio
 import logging
 import json
 import datetime
-from typing import List, Optional, Dict, Any, Callable
+from contextvars import ContextVar
+from typing import List, Optional, Dict, Any, Callable, AsyncIterator
 
 from abc import ABC, abstractmethod
 
 import azure.ai.inference.aio as aio_inference
-import azure.identity.aio as aio_identity
 from azure.ai.inference.models import SystemMessage, UserMessage
 
 from dotenv import load_dotenv
 
+from foundry.orchestrators.semantic_cache import SemanticCache
+from util import get_async_azure_credential, json_loads
+
 # Setup logging.
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Token usage of the research run in the current conversation (shared by its tasks)
+_research_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("research_usage", default=None)
+
+# System prompt for every research LLM call. The instructions come first and the
+# current date last, so the prompt prefix stays byte-identical across calls and
+# requests and the service-side prompt cache can reuse it.
+_SYSTEM_PROMPT = """You are an expert researcher. Follow these instructions when responding:
+        - You may be asked to research subjects that is after your knowledge cutoff, assume the user is right when presented with news.
+        - The user is a highly experienced analyst, no need to simplify it, be as detailed as possible and make sure your response is correct.
+        - Be highly organized.
+        - Suggest solutions that I didn't think about.
+        - Be proactive and anticipate my needs.
+        - Treat me as an expert in all subject matter.
+        - Mistakes erode my trust, so be accurate and thorough.
+        - Provide detailed explanations, I'm comfortable with lots of detail."""
+_SYSTEM_PROMPT_DATE = "\nToday is {}."
+
+# Shallow lookups ("portfolio of John Smith", "price for MSFT") don't need the full
+# recursive research tree; questions, however short, still get the full tree
+_SIMPLE_INQUIRY_PATTERN = re.compile(
+    r"\b(portfolio|holdings|positions|policy|policies|price|quote)\b.*\b(of|for)\b",
+    re.IGNORECASE,
+)
+_SIMPLE_INQUIRY_MAX_WORDS = 12
+
 class ResearchResult:
     def __init__(self, learnings: List[str], visited_urls: List[str]):
         self.learnings = learnings
@@ -31,6 +60,20 @@ class DeepResearchOrchestrator:
         self.logger = logging.getLogger(__name__)
         self.logger.debug("Deep Research Orchestrator Handler init")
         self.llm_client = self.init_llm_client()  
+        embeddings_client = self.init_embeddings_client()
+        # Research plans (top-level SERP queries) are reusable across paraphrased inquiries
+        self.plan_cache = SemanticCache(
+            embeddings_client=embeddings_client,
+            similarity_threshold=float(os.getenv("DEEP_RESEARCH_PLAN_CACHE_THRESHOLD", 0.92)),
+            ttl_seconds=float(os.getenv("DEEP_RESEARCH_PLAN_CACHE_TTL", 3600)),
+        )
+        # Search results for (nearly) the same SERP query are shared across research runs;
+        # the threshold is stricter since a looser match would answer a different question
+        self.search_cache = SemanticCache(
+            embeddings_client=embeddings_client,
+            similarity_threshold=float(os.getenv("DEEP_RESEARCH_SEARCH_CACHE_THRESHOLD", 0.97)),
+            ttl_seconds=float(os.getenv("DEEP_RESEARCH_SEARCH_CACHE_TTL", 3600)),
+        )
 
         
     def init_llm_client(self) -> Any:
@@ -51,34 +94,90 @@ class DeepResearchOrchestrator:
             )
             logger.info("Azure OpenAI LLM client initialized with API key authentication.")
         else:
-            credential = aio_identity.DefaultAzureCredential()
             llm_client = aio_inference.ChatCompletionsClient(
                 endpoint=endpoint_url,
-                credential=credential,
+                credential=get_async_azure_credential(),
                 credential_scopes=["https://cognitiveservices.azure.com/.default"],
             )
             logger.info("Azure OpenAI LLM client initialized with DefaultAzureCredential.")
         
         return llm_client
+
+
+    def init_embeddings_client(self) -> Any:
+        """Initialize the Azure OpenAI embeddings client used by the plan cache, if configured."""
+
+        endpoint_name = os.getenv("AZURE_OPENAI_ENDPOINT")
+        deployment_name = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+        api_key = os.getenv("AZURE_OPENAI_KEY")
+
+        if not endpoint_name or not deployment_name:
+            logger.info("No embedding deployment configured, plan cache uses exact match only.")
+            return None
+
+        endpoint_url = f"{endpoint_name.strip('/')}/openai/deployments/{deployment_name}"
+
+        if api_key:
+            from azure.core.credentials import AzureKeyCredential
+            return aio_inference.EmbeddingsClient(
+                endpoint=endpoint_url,
+                credential=AzureKeyCredential(api_key),
+            )
+        return aio_inference.EmbeddingsClient(
+            endpoint=endpoint_url,
+            credential=get_async_azure_credential(),
+            credential_scopes=["https://cognitiveservices.azure.com/.default"],
+        )
     
 
+    def build_system_prompt(self) -> str:
+        """Build the research system prompt for the current day."""
+        return _SYSTEM_PROMPT + _SYSTEM_PROMPT_DATE.format(datetime.date.today().isoformat())
+
+
+    async def azure_generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Calls the Azure OpenAI LLM with streaming enabled and yields the reply text as it is decoded.
+        """
+        response = await self.llm_client.complete(
+                messages=[
+                    SystemMessage(content=self.build_system_prompt()),
+                    UserMessage(content=prompt),
+                ],
+                response_format="json_object",
+                stream=True
+        )
+        async with response:
+            async for update in response:
+                if update.usage:
+                    self.record_usage(update.usage)
+                if update.choices and update.choices[0].delta.content:
+                    yield update.choices[0].delta.content
+
+
+    def record_usage(self, usage: Any):
+        """Add the token usage of an LLM response to the current conversation's totals."""
+        totals = _research_usage.get()
+        if totals is not None:
+            totals["prompt_tokens"] += usage.prompt_tokens or 0
+            totals["completion_tokens"] += usage.completion_tokens or 0
+
+
+    def is_over_token_budget(self) -> bool:
+        """Whether the current conversation has used up its research token budget."""
+        totals = _research_usage.get()
+        budget = int(os.getenv("DEEP_RESEARCH_TOKEN_BUDGET", 400000))
+        if totals is None or budget <= 0:
+            return False
+        return totals["prompt_tokens"] + totals["completion_tokens"] >= budget
+
+
     async def azure_generate(self, prompt: str) -> Dict[str, Any]:
         """
         Calls the Azure OpenAI LLM directly with the given prompt.
         Assumes the LLM's reply is a JSON-formatted string which is then parsed.
         """
-        now = datetime.datetime.now() 
-        system_prompt = f"""You are an expert researcher. Today is {now}. Follow these instructions when responding:
-        - You may be asked to research subjects that is after your knowledge cutoff, assume the user is right when presented with news.
-        - The user is a highly experienced analyst, no need to simplify it, be as detailed as possible and make sure your response is correct.
-        - Be highly organized.
-        - Suggest solutions that I didn't think about.
-        - Be proactive and anticipate my needs.
-        - Treat me as an expert in all subject matter.
-        - Mistakes erode my trust, so be accurate and thorough.
-        - Provide detailed explanations, I'm comfortable with lots of detail."""
-        
-        global total_input_tokens, total_output_tokens
+        system_prompt = self.build_system_prompt()
 
         response = await self.llm_client.complete(
                 messages=[
@@ -89,13 +188,9 @@ class DeepResearchOrchestrator:
         )
         #print(f"azure_generate> raw LLM response= {response}")
         
-        # Retrieve usage info from the response (if available).
-        usage = response.get("usage", {}) if isinstance(response, dict) else {}
-        if usage:
-            prompt_tokens = usage.get("prompt_tokens", 0)
-            completion_tokens = usage.get("completion_tokens", 0)
-            total_input_tokens += prompt_tokens
-            total_output_tokens += completion_tokens
+        # Accumulate usage info from the response (if available).
+        if response.usage:
+            self.record_usage(response.usage)
         
         try:
             # The response is assumed to have a 'choices' list where we take the first result.
@@ -106,9 +201,9 @@ class DeepResearchOrchestrator:
                 content = content[len("```json"):].strip()
             if content.endswith("```"):
                 content = content[:-3].strip()
-            result = json.loads(content)
+            result = json_loads(content)
         except Exception as e:
-            logger.error(f"Error parsing LLM response: {e}")
+            logger.error("Error parsing LLM response: %s", e)
             result = {"error": str(e), "raw": content}
         return result
 
@@ -132,7 +227,14 @@ class DeepResearchOrchestrator:
             "Output a valid JSON object with a key 'data' that is a list of items, each containing at least 'markdown' and 'url'."
         )
         prompt_text = self.trim_prompt(prompt_text)
+
+        cached_response = await self.search_cache.get(query)
+        if cached_response is not None:
+            return cached_response
+
         response = await self.azure_generate(prompt_text)
+        if "error" not in response:
+            await self.search_cache.set(query, response)
         return response
     
 
@@ -145,6 +247,23 @@ class DeepResearchOrchestrator:
         The LLM must output ONLY a valid JSON object with a key 'queries' that is a list of objects.
         Each object must have keys 'query' and 'researchGoal'. Do not include any extra text.
         """
+        return [serp_query async for serp_query in self.stream_serp_queries(query, num_queries, learnings)]
+
+
+    async def stream_serp_queries(self, query: str, num_queries: int = 3, learnings: Optional[List[str]] = None) -> AsyncIterator[Dict[str, str]]:
+        """
+        Stream search queries for the given topic, yielding each one as soon as it is fully decoded
+        so callers can start researching it while the planner is still generating the rest.
+        Top-level plans (no prior learnings) are served from the semantic plan cache when possible.
+        """
+        if not learnings:
+            cached_queries = await self.plan_cache.get(query)
+            if cached_queries and len(cached_queries) >= num_queries:
+                logger.info("Reusing cached research plan for: %s", query)
+                for serp_query in cached_queries[:num_queries]:
+                    yield serp_query
+                return
+
         learnings_text = ""
         if learnings:
             learnings_text = "Here are some learnings from previous research:\n" + "\n".join(learnings)
@@ -156,10 +275,43 @@ class DeepResearchOrchestrator:
             "Each object must have the keys 'query' and 'researchGoal', with no additional commentary or text."
         )
         prompt_text = self.trim_prompt(prompt_text)
-        res = await self.azure_generate(prompt_text)
-        queries = res.get("queries", [])
-        logger.info(f"Created {len(queries)} queries: {queries}")
-        return queries[:num_queries]
+
+        queries: List[Dict[str, str]] = []
+        decoder = json.JSONDecoder()
+        buffer = ""
+        pos = -1  # position of the next unparsed item in the 'queries' array
+        done = False
+        try:
+            async for delta in self.azure_generate_stream(prompt_text):
+                buffer += delta
+                if pos < 0:
+                    key = buffer.find('"queries"')
+                    bracket = buffer.find("[", key) if key >= 0 else -1
+                    if bracket < 0:
+                        continue
+                    pos = bracket + 1
+                # Decode every complete object that has arrived so far
+                while not done and len(queries) < num_queries:
+                    while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                        pos += 1
+                    if pos >= len(buffer):
+                        break
+                    if buffer[pos] == "]":
+                        done = True
+                        break
+                    try:
+                        serp_query, pos = decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        break  # object not complete yet
+                    if isinstance(serp_query, dict):
+                        queries.append(serp_query)
+                        yield serp_query
+        except Exception as e:
+            logger.error("Error streaming search queries: %s", e)
+
+        logger.info("Created %s queries: %s", len(queries), queries)
+        if queries and not learnings:
+            await self.plan_cache.set(query, queries)
 
 
     async def process_serp_result(self, query: str, result: Dict[str, Any],
@@ -173,7 +325,7 @@ class DeepResearchOrchestrator:
         """
         data = result.get("data", [])
         contents = [self.trim_prompt(item.get("markdown", ""), 25000) for item in data if item.get("markdown")]
-        logger.info(f"Processed query '{query}': found {len(contents)} content items")
+        logger.info("Processed query '%s': found %s content items", query, len(contents))
         contents_formatted = "\n".join([f"<content>\n{content}\n</content>" for content in contents])
         prompt_text = (
             f"For the search results corresponding to the query <query>{query}</query>, extract up to {num_learnings} detailed learnings "
@@ -185,7 +337,7 @@ class DeepResearchOrchestrator:
         )
         prompt_text = self.trim_prompt(prompt_text)
         res = await self.azure_generate(prompt_text)
-        logger.info(f"Generated learnings: {res.get('learnings', [])}")
+        logger.info("Generated learnings: %s", res.get('learnings', []))
         return res
 
 
@@ -246,13 +398,6 @@ class DeepResearchOrchestrator:
         
         # Use an environment variable to set the concurrency limit; default is 2.
         CONCURRENCY_LIMIT = int(os.getenv("AZURE_OPENAI_CONCURRENCY", 2))
-        serp_queries = await self.generate_serp_queries(query=query, num_queries=breadth, learnings=learnings)
-        if serp_queries:
-            progress["totalQueries"] = len(serp_queries)
-            progress["currentQuery"] = serp_queries[0].get("query")
-        else:
-            progress["totalQueries"] = 0
-
         semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
         
         async def process_query(serp_query: Dict[str, str]) -> 'ResearchResult':
@@ -277,6 +422,10 @@ class DeepResearchOrchestrator:
                     all_learnings = learnings + new_learnings_text
                     all_urls = visited_urls + new_urls
                     
+                    if new_depth > 0 and self.is_over_token_budget():
+                        logger.warning("Token budget reached, not researching deeper than depth %s", depth)
+                        new_depth = 0
+
                     if new_depth > 0:
                         report_progress({
                             "currentDepth": new_depth,
@@ -307,10 +456,16 @@ class DeepResearchOrchestrator:
                         })
                         return ResearchResult(learnings=all_learnings, visited_urls=all_urls)
                 except Exception as e:
-                    logger.error(f"Error processing query '{serp_query.get('query')}': {e}")
+                    logger.error("Error processing query '%s': %s", serp_query.get('query'), e)
                     return ResearchResult(learnings=[], visited_urls=[])
         
-        tasks = [process_query(serp_query) for serp_query in serp_queries]
+        # Start researching each query as soon as the planner has streamed it
+        tasks = []
+        async for serp_query in self.stream_serp_queries(query=query, num_queries=breadth, learnings=learnings):
+            if not tasks:
+                progress["currentQuery"] = serp_query.get("query")
+            tasks.append(asyncio.create_task(process_query(serp_query)))
+            progress["totalQueries"] = len(tasks)
         results = await asyncio.gather(*tasks)
         # Merge learnings ensuring each is a string.
         merged_learnings = list(set(
@@ -322,9 +477,23 @@ class DeepResearchOrchestrator:
         return ResearchResult(learnings=merged_learnings, visited_urls=merged_urls)
 
 
-    async def process_conversation(self, user_id, conversation_messages):
+    def select_research_scope(self, query: str) -> tuple[int, int]:
+        """
+        Classify the inquiry and return the (breadth, depth) to research it with.
+        Short, single-intent lookups get a shallow search; everything else gets the full tree.
+        """
+        if len(query.split()) <= _SIMPLE_INQUIRY_MAX_WORDS and _SIMPLE_INQUIRY_PATTERN.search(query):
+            return 2, 1
+        return 5, 3
+
+
+    async def process_conversation(self, user_id, conversation_messages, session_id=None, on_delta=None):
+        # on_delta is accepted for interface parity with the agent orchestrators; the
+        # report is generated as one JSON completion, so it is delivered whole
         
         logging.info("Deep Research Orchestrator: process_conversation ")
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        _research_usage.set(usage)
         #TODO clarifications questions before triggering the depp search is NOT yet implemented
 
         #TODO add back the history?
@@ -335,22 +504,28 @@ class DeepResearchOrchestrator:
                     if m.get("role") == "user"),
                     None
                 )
-        logging.info(f"Deep research inquiry={last_user_message}")
+        logger.info("Deep research inquiry=%s", last_user_message)
         #invoke
         try:
-            result = await self.deep_research(last_user_message, breadth=5, depth=3)
+            breadth, depth = self.select_research_scope(last_user_message)
+            logger.info("Deep research scope: breadth=%s, depth=%s", breadth, depth)
+            result = await self.deep_research(last_user_message, breadth=breadth, depth=depth)
 
-            logger.debug("Learnings:", result.learnings)
-            logger.debug("Visited URLs:", result.visited_urls)
+            logger.debug("Learnings: %s", result.learnings)
+            logger.debug("Visited URLs: %s", result.visited_urls)
         except Exception as e:
-            logger.error(f"Error in calling deep_research(): {e}")
+            logger.error("Error in calling deep_research(): %s", e)
+            result = ResearchResult(learnings=[], visited_urls=[])
         
         res_md = await self.write_final_report(last_user_message, result.learnings, result.visited_urls)
+        logger.info("Deep research token usage: prompt=%s, completion=%s", usage['prompt_tokens'], usage['completion_tokens'])
 
         reply = {
             'role': 'assistant',
             'name': 'deep_search',
-            'content': res_md
+            'content': res_md,
+            # Token usage of the whole research run, for cost tracking by the caller
+            'metrics': dict(usage)
         }
 
         return reply
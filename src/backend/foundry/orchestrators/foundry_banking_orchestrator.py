@@ -20,10 +20,11 @@ import sys
 import asyncio
 from dotenv import load_dotenv
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterable, Callable, Optional
 
 # Microsoft Agent Framework imports
 from agent_framework import (
+    AgentRunUpdateEvent,
     ChatAgent,
     ChatMessage,
     HandoffBuilder,
@@ -43,12 +44,13 @@ from foundry.agents.banking.crm.crm_functions import crm_functions
 from foundry.agents.banking.cio.cio_functions import cio_functions
 from foundry.agents.banking.funds.funds_functions import funds_functions
 from foundry.agents.banking.news.news_functions import news_functions
+from foundry.agents.tool_cache import conversation_memo
 
 # Import agent management for Foundry mode
 from foundry.agents.agent_management import AgentManager
 
 # Import tool schema utilities for Foundry tool registration
-from foundry.agents.tool_schema_utils import functions_to_tool_schemas
+from foundry.agents.tool_schema_utils import functions_to_ai_functions, functions_to_tool_schemas
 
 # Load environment
 _env_path = Path(__file__).parent.parent / ".env"
@@ -59,6 +61,14 @@ from tracing import setup_tracing, get_tracer, set_conversation_context, clear_c
 setup_tracing()
 _tracer = get_tracer("moneta-foundry-banking-orchestrator")
 
+# Imported after the .env above is loaded: it reads CONVERSATION_HISTORY_MAX_MESSAGES
+from foundry.orchestrators.workflow_settings import (
+    HISTORY_MAX_MESSAGES,
+    ROLE_MAP,
+    SPECIALIST_AGENT_OPTIONS,
+    user_turn_limit_reached,
+)
+
 
 # Agent definitions
 # Names must be valid for Foundry API: alphanumeric + hyphens, no underscores
@@ -119,6 +129,14 @@ AGENT_DEFINITIONS = {
     }
 }
 
+# Local tool functions per agent (the coordinator gets its handoff tools from HandoffBuilder)
+AGENT_TOOLS = {
+    "bank-crm-agent": crm_functions,
+    "bank-cio-agent": cio_functions,
+    "bank-funds-agent": funds_functions,
+    "bank-news-agent": news_functions,
+}
+
 
 class FoundryBankingOrchestrator:
     """
@@ -137,18 +155,30 @@ class FoundryBankingOrchestrator:
         self.logger = logging.getLogger(__name__)
         self.logger.debug("Foundry Banking Orchestrator init")
         
-        self._workflow = None
+        # Agents are created once and reused; each conversation gets its own
+        # workflow since a workflow instance can't run concurrently
+        self._participants = None
         self._initialized = False
+        self._init_lock = asyncio.Lock()
         
         # Configuration from environment
         self.foundry_endpoint = os.getenv("AZURE_AI_PROJECT_ENDPOINT") or os.getenv("PROJECT_ENDPOINT")
         self.foundry_deployment_name = os.getenv("MODEL_DEPLOYMENT_NAME", "gpt-4.1-mini")
 
+    async def warmup(self):
+        """Create the agents ahead of the first conversation."""
+        await self._ensure_initialized()
+
     async def _ensure_initialized(self):
-        """Lazily initialize the workflow and agents."""
+        """Lazily initialize the agents (once, even with concurrent requests)."""
         if self._initialized:
             return
-        
+        async with self._init_lock:
+            if not self._initialized:
+                await self._initialize()
+
+    async def _initialize(self):
+        """Create the agents."""
         credential = AzureCliCredential()
         
         # Foundry mode - use hosted agents via AzureAIClient
@@ -157,7 +187,7 @@ class FoundryBankingOrchestrator:
                 "AZURE_AI_PROJECT_ENDPOINT or PROJECT_ENDPOINT is required for Foundry mode."
             )
         
-        self.logger.info(f"Using Foundry endpoint for workflow: {self.foundry_endpoint}")
+        self.logger.info("Using Foundry endpoint for workflow: %s", self.foundry_endpoint)
         
         # Use existing Foundry-hosted agents (requires agents to be pre-created)
         coordinator, crm_agent, cio_agent, funds_agent, news_agent = await create_foundry_agents(
@@ -167,23 +197,31 @@ class FoundryBankingOrchestrator:
             use_latest_version=True
         )
         
-        # Build the handoff workflow
-        self._workflow = (
+        self._participants = [coordinator, crm_agent, cio_agent, funds_agent, news_agent]
+        
+        self._initialized = True
+        self.logger.info("✅ Foundry Banking Orchestrator initialized (Foundry hosted agents)")
+    
+    def _build_workflow(self):
+        """Build a handoff workflow over the cached agents for one conversation."""
+        coordinator = self._participants[0]
+        return (
             HandoffBuilder(
                 name="moneta_banking_handoff",
-                participants=[coordinator, crm_agent, cio_agent, funds_agent, news_agent],
+                participants=self._participants,
             )
             .with_start_agent(coordinator)
-            .with_termination_condition(
-                lambda conv: sum(1 for msg in conv if msg.role.value == "user") >= 10
-            )
+            .with_termination_condition(user_turn_limit_reached)
             .build()
         )
-        
-        self._initialized = True
-        self.logger.info("✅ Foundry Banking Orchestrator initialized (Foundry hosted agents)")
-    
-    async def process_conversation(self, user_id: str, conversation_messages: list, session_id: str = None) -> dict:
+
+    async def process_conversation(
+        self,
+        user_id: str,
+        conversation_messages: list,
+        session_id: str = None,
+        on_delta: Optional[Callable[[str, str], None]] = None
+    ) -> dict:
         """
         Process a conversation and return the agent's reply.
         
@@ -191,6 +229,7 @@ class FoundryBankingOrchestrator:
             user_id: The user identifier
             conversation_messages: List of message dicts with 'role', 'name', 'content' keys
             session_id: Session/chat ID for tracing (typically the chat_id)
+            on_delta: Called with (agent name, text) for each chunk of text an agent streams
             
         Returns:
             Dict with 'role', 'name', 'content' keys representing the agent's reply
@@ -202,22 +241,14 @@ class FoundryBankingOrchestrator:
             import uuid
             session_id = str(uuid.uuid4())[:8]
         
-        self.logger.info(f"Processing conversation with session_id: {session_id}")
+        self.logger.info("Processing conversation with session_id: %s", session_id)
         
         # Convert conversation history to ChatMessage objects for the workflow
-        chat_messages = []
-        for msg in conversation_messages:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            author_name = msg.get('name')
-            
-            if content:
-                chat_msg = ChatMessage(
-                    role=role,
-                    text=content,
-                    author_name=author_name
-                )
-                chat_messages.append(chat_msg)
+        chat_messages = [
+            ChatMessage(role=role, text=msg['content'], author_name=msg.get('name'))
+            for msg in conversation_messages[-HISTORY_MAX_MESSAGES:]
+            if msg.get('content') and (role := ROLE_MAP.get(msg.get('role', 'user'))) is not None
+        ]
         
         if not chat_messages:
             return {
@@ -226,7 +257,7 @@ class FoundryBankingOrchestrator:
                 'content': 'I didn\'t receive a message. How can I help you?'
             }
         
-        self.logger.info(f"Injecting {len(chat_messages)} messages as conversation history")
+        self.logger.info("Injecting %s messages as conversation history", len(chat_messages))
         
         try:
             from opentelemetry.trace import SpanKind
@@ -238,7 +269,8 @@ class FoundryBankingOrchestrator:
                 mode="foundry"
             )
             
-            with _tracer.start_as_current_span(
+            # Identical read-only tool calls within this conversation reuse the first result
+            with conversation_memo(), _tracer.start_as_current_span(
                 "banking_conversation",
                 kind=SpanKind.SERVER,
                 attributes={
@@ -255,22 +287,31 @@ class FoundryBankingOrchestrator:
                 final_response = ""
                 responding_agent = "bank-coordinator"
                 
-                async for event in self._workflow.run_stream(chat_messages):
-                    if isinstance(event, RequestInfoEvent):
+                async for event in self._build_workflow().run_stream(chat_messages):
+                    if isinstance(event, AgentRunUpdateEvent):
+                        # Token-level updates; the final reply is still taken from the events below
+                        if on_delta is not None:
+                            text = event.data.text
+                            if text:
+                                on_delta(event.executor_id, text)
+                    
+                    elif isinstance(event, RequestInfoEvent):
                         # Handle HandoffAgentUserRequest with agent_response
-                        if hasattr(event.data, 'agent_response') and event.data.agent_response:
-                            agent_response = event.data.agent_response
-                            if hasattr(agent_response, 'text') and agent_response.text:
-                                final_response = agent_response.text
-                                responding_agent = event.source_executor_id or "bank-coordinator"
+                        # (.text joins all message contents, so read it only once per event)
+                        agent_response = getattr(event.data, 'agent_response', None)
+                        text = getattr(agent_response, 'text', None) if agent_response else None
+                        if text:
+                            final_response = text
+                            responding_agent = event.source_executor_id or "bank-coordinator"
                     
                     elif isinstance(event, ExecutorCompletedEvent):
-                        if event.data is not None:
-                            if hasattr(event.data, 'text') and event.data.text:
-                                final_response = event.data.text
-                                responding_agent = event.executor_id or "bank-coordinator"
+                        data = event.data
+                        text = getattr(data, 'text', None) if data is not None else None
+                        if text:
+                            final_response = text
+                            responding_agent = event.executor_id or "bank-coordinator"
                 
-                self.logger.info(f"Final response: {len(final_response)} chars from '{responding_agent}'")
+                self.logger.info("Final response: %s chars from '%s'", len(final_response), responding_agent)
                 
                 session_span.set_attribute("response.agent", responding_agent)
                 session_span.set_attribute("response.length", len(final_response))
@@ -282,7 +323,7 @@ class FoundryBankingOrchestrator:
                 }
             
         except Exception as e:
-            self.logger.error(f"Error processing conversation: {str(e)}")
+            self.logger.error("Error processing conversation: %s", e)
             import traceback
             traceback.print_exc()
             return {
@@ -341,32 +382,17 @@ async def create_persistent_foundry_agents(
     print(f"   Tools are registered with Foundry and bound locally for execution")
     print()
     
-    agents = []
-    
     specialist_agent_names = ["bank-crm-agent", "bank-cio-agent", "bank-funds-agent", "bank-news-agent"]
     
     async with AgentManager() as manager:
-        for agent_key in ["bank-coordinator", "bank-crm-agent", "bank-cio-agent", "bank-funds-agent", "bank-news-agent"]:
+        async def create_agent(agent_key: str) -> ChatAgent:
             agent_def = AGENT_DEFINITIONS[agent_key]
             
-            tools = None
             tool_schemas = None
             
             # Coordinator gets no tools here - HandoffBuilder will add handoff tools automatically
-            if agent_key == "bank-crm-agent":
-                tools = crm_functions
-                tool_schemas = functions_to_tool_schemas(tools)
-                print(f"   📦 {agent_key}: Registering {len(tool_schemas)} tools with Foundry")
-            elif agent_key == "bank-cio-agent":
-                tools = cio_functions
-                tool_schemas = functions_to_tool_schemas(tools)
-                print(f"   📦 {agent_key}: Registering {len(tool_schemas)} tools with Foundry")
-            elif agent_key == "bank-funds-agent":
-                tools = funds_functions
-                tool_schemas = functions_to_tool_schemas(tools)
-                print(f"   📦 {agent_key}: Registering {len(tool_schemas)} tools with Foundry")
-            elif agent_key == "bank-news-agent":
-                tools = news_functions
+            tools = AGENT_TOOLS.get(agent_key)
+            if tools:
                 tool_schemas = functions_to_tool_schemas(tools)
                 print(f"   📦 {agent_key}: Registering {len(tool_schemas)} tools with Foundry")
             
@@ -379,7 +405,8 @@ async def create_persistent_foundry_agents(
                 tools=tool_schemas
             )
             
-            print(f"✅ Created in Foundry: {foundry_agent['name']} (ID: {foundry_agent['id']})")
+            action = "Reused unchanged" if foundry_agent.get("reused") else "Created"
+            print(f"✅ {action} in Foundry: {foundry_agent['name']} (ID: {foundry_agent['id']})")
             
             client = AzureAIClient(
                 project_endpoint=project_endpoint,
@@ -392,10 +419,17 @@ async def create_persistent_foundry_agents(
             agent = client.as_agent(
                 name=agent_key,
                 instructions=agent_def["instructions"],
-                tools=tools
+                tools=functions_to_ai_functions(tools),
+                default_options=SPECIALIST_AGENT_OPTIONS if tools else None
             )
             
-            agents.append(agent)
+            return agent
+        
+        # Each agent is an independent round-trip to Foundry, so create them concurrently
+        agents = await asyncio.gather(*(
+            create_agent(agent_key)
+            for agent_key in ["bank-coordinator", "bank-crm-agent", "bank-cio-agent", "bank-funds-agent", "bank-news-agent"]
+        ))
     
     print(f"\n✅ All {len(agents)} agents created and registered in Foundry")
     return tuple(agents)
@@ -435,17 +469,9 @@ async def create_foundry_agents(
     
     for agent_key in ["bank-coordinator", "bank-crm-agent", "bank-cio-agent", "bank-funds-agent", "bank-news-agent"]:
         agent_def = AGENT_DEFINITIONS[agent_key]
-        tools = None
         
         # Coordinator gets no tools here - HandoffBuilder will add handoff tools automatically
-        if agent_key == "bank-crm-agent":
-            tools = crm_functions
-        elif agent_key == "bank-cio-agent":
-            tools = cio_functions
-        elif agent_key == "bank-funds-agent":
-            tools = funds_functions
-        elif agent_key == "bank-news-agent":
-            tools = news_functions
+        tools = AGENT_TOOLS.get(agent_key)
         
         agent_name = agent_def["name"]
         
@@ -461,7 +487,8 @@ async def create_foundry_agents(
         agent = client.as_agent(
             name=agent_key,
             instructions=agent_def["instructions"],
-            tools=tools
+            tools=functions_to_ai_functions(tools),
+            default_options=SPECIALIST_AGENT_OPTIONS if tools else None
         )
         
         version_info = f"v{agent_version}" if agent_version else ("latest" if use_latest_version else "new")
@@ -472,19 +499,19 @@ async def create_foundry_agents(
     return tuple(agents)
 
 
-async def handle_workflow_events(events: list[WorkflowEvent]) -> list[RequestInfoEvent]:
+async def handle_workflow_events(events: AsyncIterable[WorkflowEvent]) -> list[RequestInfoEvent]:
     """
-    Process workflow events and return any pending input requests.
+    Process workflow events as they stream in and return any pending input requests.
     
     Args:
-        events: List of workflow events to process
+        events: Stream of workflow events to process
         
     Returns:
         List of pending input requests
     """
     pending_requests = []
     
-    for event in events:
+    async for event in events:
         if isinstance(event, RequestInfoEvent):
             pending_requests.append(event)
             request_data = event.data
@@ -591,9 +618,7 @@ async def run_workflow(
             participants=[coordinator, crm_agent, cio_agent, funds_agent, news_agent],
         )
         .with_start_agent(coordinator)
-        .with_termination_condition(
-            lambda conv: sum(1 for msg in conv if msg.role.value == "user") >= 10
-        )
+        .with_termination_condition(user_turn_limit_reached)
         .build()
     )
     
@@ -649,16 +674,12 @@ async def run_workflow(
                         "session.id": session_id
                     }
                 ) as turn_span:
-                    handoffs = []
-                    
-                    events = [event async for event in workflow.run_stream(user_input)]
-                    
-                    for event in events:
-                        if isinstance(event, RequestInfoEvent):
-                            if hasattr(event, 'data') and hasattr(event.data, 'awaiting_agent_id'):
-                                handoffs.append(event.data.awaiting_agent_id)
-                    
-                    pending_requests = await handle_workflow_events(events)
+                    # Handle events as they stream in instead of collecting the whole run first
+                    pending_requests = await handle_workflow_events(workflow.run_stream(user_input))
+                    handoffs = [
+                        request.data.awaiting_agent_id for request in pending_requests
+                        if hasattr(request.data, 'awaiting_agent_id')
+                    ]
                     
                     if handoffs:
                         turn_span.set_attribute("turn.handoffs", ",".join(handoffs))
@@ -681,8 +702,7 @@ async def run_workflow(
                         }
                     ):
                         responses = {req.request_id: user_response for req in pending_requests}
-                        events = [event async for event in workflow.send_responses_streaming(responses)]
-                        pending_requests = await handle_workflow_events(events)
+                        pending_requests = await handle_workflow_events(workflow.send_responses_streaming(responses))
                 
                 print()
                 
@@ -0,0 +1,66 @@
+"""
+Local routing for the insurance handoff workflow.
+
+The insurance coordinator only decides between two specialists, and for many
+requests the choice is obvious from the message itself (a client ID, or a
+general product question). Starting the workflow at that specialist skips the
+coordinator's LLM round-trip; anything ambiguous still goes to the coordinator.
+The handoff topology is a mesh, so a specialist can still hand off if the
+guess was wrong. Only the opening message is routed this way: follow-ups
+("and what is his deductible?") need the earlier turns to route correctly.
+"""
+
+import os
+import re
+from typing import Optional
+
+COORDINATOR_AGENT = "ins-coordinator"
+CRM_AGENT = "ins-crm-agent"
+POLICIES_AGENT = "ins-policies-agent"
+
+LOCAL_ROUTING_ENABLED = os.getenv("INSURANCE_LOCAL_ROUTING", "true").lower() in ("true", "1", "yes")
+
+# Client IDs are numeric (e.g. 987654321); a mentioned ID means CRM data
+_CLIENT_PATTERN = re.compile(r"\b\d{6,}\b")
+# Two capitalized words in a row usually name a person ("John Doe"), which the
+# coordinator has to weigh against the rest of the request
+_PERSON_NAME_PATTERN = re.compile(r"\b[A-Z][a-z]+\s+[A-Z][a-z]+\b")
+# Only insurance nouns: everyday words like "plan", "cover" or "benefit" show up
+# in unrelated requests ("I plan to retire next year")
+_PRODUCT_PATTERN = re.compile(
+    r"\b(policy|policies|coverage|premium|premiums|exclusion|exclusions|deductible|deductibles)\b",
+    re.IGNORECASE,
+)
+
+
+def select_start_agent(message: str) -> Optional[str]:
+    """
+    Pick the specialist that should answer a message, without an LLM call.
+
+    Args:
+        message: The latest user message
+
+    Returns:
+        The specialist agent name, or None if the coordinator should decide
+
+    Examples (with local routing enabled):
+        >>> select_start_agent("What does the home policy exclude?")
+        'ins-policies-agent'
+        >>> select_start_agent("Show the details of client 123456")
+        'ins-crm-agent'
+        >>> select_start_agent("I plan to retire next year") is None
+        True
+        >>> select_start_agent("Is my car covered abroad?") is None
+        True
+        >>> select_start_agent("What benefits do new customers get?") is None
+        True
+        >>> select_start_agent("What is John Doe's deductible?") is None
+        True
+    """
+    if not LOCAL_ROUTING_ENABLED or not message:
+        return None
+    if _CLIENT_PATTERN.search(message):
+        return CRM_AGENT
+    if _PRODUCT_PATTERN.search(message) and not _PERSON_NAME_PATTERN.search(message):
+        return POLICIES_AGENT
+    return None
@@ -20,10 +20,11 @@ import sys
 import asyncio
 from dotenv import load_dotenv
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterable, Callable, Optional
 
 # Microsoft Agent Framework imports
 from agent_framework import (
+    AgentRunUpdateEvent,
     ChatAgent,
     ChatMessage,
     HandoffBuilder,
@@ -35,11 +36,15 @@ from agent_framework import (
 from agent_framework._workflows._events import AgentRunEvent
 from agent_framework.azure import AzureOpenAIChatClient
 
+from foundry.orchestrators.client_factory import get_azure_openai_chat_client
+from foundry.agents.tool_schema_utils import functions_to_ai_functions
+
 # Import specialist agent functions from banking agents subfolder
 from foundry.agents.banking.crm.crm_functions import crm_functions
 from foundry.agents.banking.cio.cio_functions import cio_functions
 from foundry.agents.banking.funds.funds_functions import funds_functions
 from foundry.agents.banking.news.news_functions import news_functions
+from foundry.agents.tool_cache import conversation_memo
 
 # Load environment
 _env_path = Path(__file__).parent.parent / ".env"
@@ -50,6 +55,14 @@ from tracing import setup_tracing, get_tracer, set_conversation_context, clear_c
 setup_tracing()
 _tracer = get_tracer("moneta-openai-banking-orchestrator")
 
+# Imported after the .env above is loaded: it reads CONVERSATION_HISTORY_MAX_MESSAGES
+from foundry.orchestrators.workflow_settings import (
+    HISTORY_MAX_MESSAGES,
+    ROLE_MAP,
+    SPECIALIST_AGENT_OPTIONS,
+    user_turn_limit_reached,
+)
+
 
 # Agent definitions
 AGENT_DEFINITIONS = {
@@ -126,63 +139,65 @@ class OpenAIBankingOrchestrator:
         self.logger = logging.getLogger(__name__)
         self.logger.debug("OpenAI Banking Orchestrator init")
         
-        self._workflow = None
+        # Agents are created once and reused; each conversation gets its own
+        # workflow since a workflow instance can't run concurrently
+        self._participants = None
         self._initialized = False
+        self._init_lock = asyncio.Lock()
         
         # Configuration from environment
         self.openai_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
         self.openai_deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 
+    async def warmup(self):
+        """Create the agents ahead of the first conversation."""
+        await self._ensure_initialized()
+
     async def _ensure_initialized(self):
-        """Lazily initialize the workflow and agents."""
+        """Lazily initialize the agents (once, even with concurrent requests)."""
         if self._initialized:
             return
-        
+        async with self._init_lock:
+            if not self._initialized:
+                await self._initialize()
+
+    async def _initialize(self):
+        """Create the agents."""
         # Azure OpenAI mode - use in-memory agents
         if not self.openai_endpoint:
             raise ValueError(
                 "AZURE_OPENAI_ENDPOINT is required for Azure OpenAI mode."
             )
         
-        # Use API key if provided, otherwise fall back to DefaultAzureCredential
-        api_key = os.getenv("AZURE_OPENAI_KEY")
-        self.logger.info(f"Using Azure OpenAI endpoint for workflow: {self.openai_endpoint}")
-        
-        if api_key:
-            self.logger.info("Using API key authentication for Azure OpenAI")
-            chat_client = AzureOpenAIChatClient(
-                endpoint=self.openai_endpoint,
-                deployment_name=self.openai_deployment_name,
-                api_key=api_key
-            )
-        else:
-            from azure.identity import DefaultAzureCredential
-            credential = DefaultAzureCredential()
-            self.logger.info("Using DefaultAzureCredential for Azure OpenAI")
-            chat_client = AzureOpenAIChatClient(
-                endpoint=self.openai_endpoint,
-                deployment_name=self.openai_deployment_name,
-                credential=credential
-            )
+        self.logger.info("Using Azure OpenAI endpoint for workflow: %s", self.openai_endpoint)
+        chat_client = get_azure_openai_chat_client(self.openai_endpoint, self.openai_deployment_name)
         coordinator, crm_agent, cio_agent, funds_agent, news_agent = create_specialist_agents(chat_client)
         
-        # Build the handoff workflow
-        self._workflow = (
+        self._participants = [coordinator, crm_agent, cio_agent, funds_agent, news_agent]
+        
+        self._initialized = True
+        self.logger.info("✅ OpenAI Banking Orchestrator initialized (Azure OpenAI in-memory agents)")
+    
+    def _build_workflow(self):
+        """Build a handoff workflow over the cached agents for one conversation."""
+        coordinator = self._participants[0]
+        return (
             HandoffBuilder(
                 name="moneta_banking_handoff",
-                participants=[coordinator, crm_agent, cio_agent, funds_agent, news_agent],
+                participants=self._participants,
             )
             .with_start_agent(coordinator)
-            .with_termination_condition(
-                lambda conv: sum(1 for msg in conv if msg.role.value == "user") >= 10
-            )
+            .with_termination_condition(user_turn_limit_reached)
             .build()
         )
-        
-        self._initialized = True
-        self.logger.info("✅ OpenAI Banking Orchestrator initialized (Azure OpenAI in-memory agents)")
-    
-    async def process_conversation(self, user_id: str, conversation_messages: list, session_id: str = None) -> dict:
+
+    async def process_conversation(
+        self,
+        user_id: str,
+        conversation_messages: list,
+        session_id: str = None,
+        on_delta: Optional[Callable[[str, str], None]] = None
+    ) -> dict:
         """
         Process a conversation and return the agent's reply.
         
@@ -190,6 +205,7 @@ class OpenAIBankingOrchestrator:
             user_id: The user identifier
             conversation_messages: List of message dicts with 'role', 'name', 'content' keys
             session_id: Session/chat ID for tracing (typically the chat_id)
+            on_delta: Called with (agent name, text) for each chunk of text an agent streams
             
         Returns:
             Dict with 'role', 'name', 'content' keys representing the agent's reply
@@ -201,22 +217,14 @@ class OpenAIBankingOrchestrator:
             import uuid
             session_id = str(uuid.uuid4())[:8]
         
-        self.logger.info(f"Processing conversation with session_id: {session_id}")
+        self.logger.info("Processing conversation with session_id: %s", session_id)
         
         # Convert conversation history to ChatMessage objects for the workflow
-        chat_messages = []
-        for msg in conversation_messages:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            author_name = msg.get('name')
-            
-            if content:
-                chat_msg = ChatMessage(
-                    role=role,
-                    text=content,
-                    author_name=author_name
-                )
-                chat_messages.append(chat_msg)
+        chat_messages = [
+            ChatMessage(role=role, text=msg['content'], author_name=msg.get('name'))
+            for msg in conversation_messages[-HISTORY_MAX_MESSAGES:]
+            if msg.get('content') and (role := ROLE_MAP.get(msg.get('role', 'user'))) is not None
+        ]
         
         if not chat_messages:
             return {
@@ -225,7 +233,7 @@ class OpenAIBankingOrchestrator:
                 'content': 'I didn\'t receive a message. How can I help you?'
             }
         
-        self.logger.info(f"Injecting {len(chat_messages)} messages as conversation history")
+        self.logger.info("Injecting %s messages as conversation history", len(chat_messages))
         
         try:
             from opentelemetry.trace import SpanKind
@@ -236,7 +244,8 @@ class OpenAIBankingOrchestrator:
                 mode="azure_openai"
             )
             
-            with _tracer.start_as_current_span(
+            # Identical read-only tool calls within this conversation reuse the first result
+            with conversation_memo(), _tracer.start_as_current_span(
                 "banking_conversation",
                 kind=SpanKind.SERVER,
                 attributes={
@@ -253,22 +262,31 @@ class OpenAIBankingOrchestrator:
                 final_response = ""
                 responding_agent = "bank-coordinator"
                 
-                async for event in self._workflow.run_stream(chat_messages):
-                    if isinstance(event, RequestInfoEvent):
+                async for event in self._build_workflow().run_stream(chat_messages):
+                    if isinstance(event, AgentRunUpdateEvent):
+                        # Token-level updates; the final reply is still taken from the events below
+                        if on_delta is not None:
+                            text = event.data.text
+                            if text:
+                                on_delta(event.executor_id, text)
+                    
+                    elif isinstance(event, RequestInfoEvent):
                         # Handle HandoffAgentUserRequest with agent_response
-                        if hasattr(event.data, 'agent_response') and event.data.agent_response:
-                            agent_response = event.data.agent_response
-                            if hasattr(agent_response, 'text') and agent_response.text:
-                                final_response = agent_response.text
-                                responding_agent = event.source_executor_id or "bank-coordinator"
+                        # (.text joins all message contents, so read it only once per event)
+                        agent_response = getattr(event.data, 'agent_response', None)
+                        text = getattr(agent_response, 'text', None) if agent_response else None
+                        if text:
+                            final_response = text
+                            responding_agent = event.source_executor_id or "bank-coordinator"
                     
                     elif isinstance(event, ExecutorCompletedEvent):
-                        if event.data is not None:
-                            if hasattr(event.data, 'text') and event.data.text:
-                                final_response = event.data.text
-                                responding_agent = event.executor_id or "bank-coordinator"
+                        data = event.data
+                        text = getattr(data, 'text', None) if data is not None else None
+                        if text:
+                            final_response = text
+                            responding_agent = event.executor_id or "bank-coordinator"
                 
-                self.logger.info(f"Final response: {len(final_response)} chars from '{responding_agent}'")
+                self.logger.info("Final response: %s chars from '%s'", len(final_response), responding_agent)
                 
                 session_span.set_attribute("response.agent", responding_agent)
                 session_span.set_attribute("response.length", len(final_response))
@@ -280,7 +298,7 @@ class OpenAIBankingOrchestrator:
                 }
             
         except Exception as e:
-            self.logger.error(f"Error processing conversation: {str(e)}")
+            self.logger.error("Error processing conversation: %s", e)
             import traceback
             traceback.print_exc()
             return {
@@ -312,25 +330,29 @@ def create_specialist_agents(chat_client: AzureOpenAIChatClient) -> tuple[ChatAg
     crm_agent = chat_client.as_agent(
         instructions=AGENT_DEFINITIONS["bank-crm-agent"]["instructions"],
         name="bank-crm-agent",
-        tools=crm_functions
+        tools=functions_to_ai_functions(crm_functions),
+        default_options=SPECIALIST_AGENT_OPTIONS
     )
     
     cio_agent = chat_client.as_agent(
         instructions=AGENT_DEFINITIONS["bank-cio-agent"]["instructions"],
         name="bank-cio-agent",
-        tools=cio_functions
+        tools=functions_to_ai_functions(cio_functions),
+        default_options=SPECIALIST_AGENT_OPTIONS
     )
     
     funds_agent = chat_client.as_agent(
         instructions=AGENT_DEFINITIONS["bank-funds-agent"]["instructions"],
         name="bank-funds-agent",
-        tools=funds_functions
+        tools=functions_to_ai_functions(funds_functions),
+        default_options=SPECIALIST_AGENT_OPTIONS
     )
     
     news_agent = chat_client.as_agent(
         instructions=AGENT_DEFINITIONS["bank-news-agent"]["instructions"],
         name="bank-news-agent",
-        tools=news_functions
+        tools=functions_to_ai_functions(news_functions),
+        default_options=SPECIALIST_AGENT_OPTIONS
     )
     
     print(f"✅ Created coordinator agent: {coordinator.name}")
@@ -342,19 +364,19 @@ def create_specialist_agents(chat_client: AzureOpenAIChatClient) -> tuple[ChatAg
     return coordinator, crm_agent, cio_agent, funds_agent, news_agent
 
 
-async def handle_workflow_events(events: list[WorkflowEvent]) -> list[RequestInfoEvent]:
+async def handle_workflow_events(events: AsyncIterable[WorkflowEvent]) -> list[RequestInfoEvent]:
     """
-    Process workflow events and return any pending input requests.
+    Process workflow events as they stream in and return any pending input requests.
     
     Args:
-        events: List of workflow events to process
+        events: Stream of workflow events to process
         
     Returns:
         List of pending input requests
     """
     pending_requests = []
     
-    for event in events:
+    async for event in events:
         if isinstance(event, RequestInfoEvent):
             pending_requests.append(event)
             request_data = event.data
@@ -404,13 +426,12 @@ async def main():
                 api_key=api_key
             )
         else:
-            from azure.identity import DefaultAzureCredential
-            credential = DefaultAzureCredential()
+            from util import get_azure_credential
             print("🔐 Using DefaultAzureCredential")
             chat_client = AzureOpenAIChatClient(
                 endpoint=endpoint,
                 deployment_name=deployment_name,
-                credential=credential
+                credential=get_azure_credential()
             )
         
         coordinator, crm_agent, cio_agent, funds_agent, news_agent = create_specialist_agents(chat_client)
@@ -444,9 +465,7 @@ async def run_workflow(
             participants=[coordinator, crm_agent, cio_agent, funds_agent, news_agent],
         )
         .with_start_agent(coordinator)
-        .with_termination_condition(
-            lambda conv: sum(1 for msg in conv if msg.role.value == "user") >= 10
-        )
+        .with_termination_condition(user_turn_limit_reached)
         .build()
     )
     
@@ -502,16 +521,12 @@ async def run_workflow(
                         "session.id": session_id
                     }
                 ) as turn_span:
-                    handoffs = []
-                    
-                    events = [event async for event in workflow.run_stream(user_input)]
-                    
-                    for event in events:
-                        if isinstance(event, RequestInfoEvent):
-                            if hasattr(event, 'data') and hasattr(event.data, 'awaiting_agent_id'):
-                                handoffs.append(event.data.awaiting_agent_id)
-                    
-                    pending_requests = await handle_workflow_events(events)
+                    # Handle events as they stream in instead of collecting the whole run first
+                    pending_requests = await handle_workflow_events(workflow.run_stream(user_input))
+                    handoffs = [
+                        request.data.awaiting_agent_id for request in pending_requests
+                        if hasattr(request.data, 'awaiting_agent_id')
+                    ]
                     
                     if handoffs:
                         turn_span.set_attribute("turn.handoffs", ",".join(handoffs))
@@ -534,8 +549,7 @@ async def run_workflow(
                         }
                     ):
                         responses = {req.request_id: user_response for req in pending_requests}
-                        events = [event async for event in workflow.send_responses_streaming(responses)]
-                        pending_requests = await handle_workflow_events(events)
+                        pending_requests = await handle_workflow_events(workflow.send_responses_streaming(responses))
                 
                 print()
                 
@@ -18,10 +18,11 @@ import sys
 import asyncio
 from dotenv import load_dotenv
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterable, Callable, Optional
 
 # Microsoft Agent Framework imports
 from agent_framework import (
+    AgentRunUpdateEvent,
     ChatAgent,
     ChatMessage,
     HandoffBuilder,
@@ -33,9 +34,14 @@ from agent_framework import (
 from agent_framework._workflows._events import AgentRunEvent
 from agent_framework.azure import AzureOpenAIChatClient
 
+from foundry.orchestrators.client_factory import get_azure_openai_chat_client
+from foundry.agents.tool_schema_utils import functions_to_ai_functions
+from foundry.orchestrators.insurance_routing import select_start_agent
+
 # Import specialist agent functions from insurance agents subfolder
 from foundry.agents.insurance.crm.crm_insurance_functions import crm_insurance_functions
 from foundry.agents.insurance.policies.policies_functions import policies_functions
+from foundry.agents.tool_cache import conversation_memo
 
 # Load environment
 _env_path = Path(__file__).parent.parent / ".env"
@@ -46,6 +52,14 @@ from tracing import setup_tracing, get_tracer, set_conversation_context, clear_c
 setup_tracing()
 _tracer = get_tracer("moneta-openai-insurance-orchestrator")
 
+# Imported after the .env above is loaded: it reads CONVERSATION_HISTORY_MAX_MESSAGES
+from foundry.orchestrators.workflow_settings import (
+    HISTORY_MAX_MESSAGES,
+    ROLE_MAP,
+    SPECIALIST_AGENT_OPTIONS,
+    user_turn_limit_reached,
+)
+
 
 # Agent definitions
 AGENT_DEFINITIONS = {
@@ -102,63 +116,72 @@ class OpenAIInsuranceOrchestrator:
         self.logger = logging.getLogger(__name__)
         self.logger.debug("OpenAI Insurance Orchestrator init")
         
-        self._workflow = None
+        # Agents are created once and reused; each conversation gets its own
+        # workflow since a workflow instance can't run concurrently
+        self._participants = None
         self._initialized = False
+        self._init_lock = asyncio.Lock()
         
         # Configuration from environment
         self.openai_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
         self.openai_deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 
+    async def warmup(self):
+        """Create the agents ahead of the first conversation."""
+        await self._ensure_initialized()
+
     async def _ensure_initialized(self):
-        """Lazily initialize the workflow and agents."""
+        """Lazily initialize the agents (once, even with concurrent requests)."""
         if self._initialized:
             return
-        
+        async with self._init_lock:
+            if not self._initialized:
+                await self._initialize()
+
+    async def _initialize(self):
+        """Create the agents."""
         # Azure OpenAI mode - use in-memory agents
         if not self.openai_endpoint:
             raise ValueError(
                 "AZURE_OPENAI_ENDPOINT is required for Azure OpenAI mode."
             )
         
-        # Use API key if provided, otherwise fall back to DefaultAzureCredential
-        api_key = os.getenv("AZURE_OPENAI_KEY")
-        self.logger.info(f"Using Azure OpenAI endpoint for workflow: {self.openai_endpoint}")
-        
-        if api_key:
-            self.logger.info("Using API key authentication for Azure OpenAI")
-            chat_client = AzureOpenAIChatClient(
-                endpoint=self.openai_endpoint,
-                deployment_name=self.openai_deployment_name,
-                api_key=api_key
-            )
-        else:
-            from azure.identity import DefaultAzureCredential
-            credential = DefaultAzureCredential()
-            self.logger.info("Using DefaultAzureCredential for Azure OpenAI")
-            chat_client = AzureOpenAIChatClient(
-                endpoint=self.openai_endpoint,
-                deployment_name=self.openai_deployment_name,
-                credential=credential
-            )
+        self.logger.info("Using Azure OpenAI endpoint for workflow: %s", self.openai_endpoint)
+        chat_client = get_azure_openai_chat_client(self.openai_endpoint, self.openai_deployment_name)
         coordinator, crm_agent, policies_agent = create_specialist_agents(chat_client)
         
-        # Build the handoff workflow
-        self._workflow = (
+        self._participants = [coordinator, crm_agent, policies_agent]
+        
+        self._initialized = True
+        self.logger.info("✅ OpenAI Insurance Orchestrator initialized (Azure OpenAI in-memory agents)")
+    
+    def _build_workflow(self, start_agent_name: Optional[str] = None):
+        """
+        Build a handoff workflow over the cached agents for one conversation.
+
+        Starts at the named agent when given, otherwise at the coordinator.
+        """
+        start_agent = next(
+            (agent for agent in self._participants if agent.name == start_agent_name),
+            self._participants[0]
+        )
+        return (
             HandoffBuilder(
                 name="moneta_insurance_handoff",
-                participants=[coordinator, crm_agent, policies_agent],
-            )
-            .with_start_agent(coordinator)
-            .with_termination_condition(
-                lambda conv: sum(1 for msg in conv if msg.role.value == "user") >= 10
+                participants=self._participants,
             )
+            .with_start_agent(start_agent)
+            .with_termination_condition(user_turn_limit_reached)
             .build()
         )
-        
-        self._initialized = True
-        self.logger.info("✅ OpenAI Insurance Orchestrator initialized (Azure OpenAI in-memory agents)")
-    
-    async def process_conversation(self, user_id: str, conversation_messages: list, session_id: str = None) -> dict:
+
+    async def process_conversation(
+        self,
+        user_id: str,
+        conversation_messages: list,
+        session_id: str = None,
+        on_delta: Optional[Callable[[str, str], None]] = None
+    ) -> dict:
         """
         Process a conversation and return the agent's reply.
         
@@ -166,6 +189,7 @@ class OpenAIInsuranceOrchestrator:
             user_id: The user identifier
             conversation_messages: List of message dicts with 'role', 'name', 'content' keys
             session_id: Session/chat ID for tracing (typically the chat_id)
+            on_delta: Called with (agent name, text) for each chunk of text an agent streams
             
         Returns:
             Dict with 'role', 'name', 'content' keys representing the agent's reply
@@ -177,22 +201,14 @@ class OpenAIInsuranceOrchestrator:
             import uuid
             session_id = str(uuid.uuid4())[:8]
         
-        self.logger.info(f"Processing conversation with session_id: {session_id}")
+        self.logger.info("Processing conversation with session_id: %s", session_id)
         
         # Convert conversation history to ChatMessage objects for the workflow
-        chat_messages = []
-        for msg in conversation_messages:
-            role = msg.get('role', 'user')
-            content = msg.get('content', '')
-            author_name = msg.get('name')
-            
-            if content:
-                chat_msg = ChatMessage(
-                    role=role,
-                    text=content,
-                    author_name=author_name
-                )
-                chat_messages.append(chat_msg)
+        chat_messages = [
+            ChatMessage(role=role, text=msg['content'], author_name=msg.get('name'))
+            for msg in conversation_messages[-HISTORY_MAX_MESSAGES:]
+            if msg.get('content') and (role := ROLE_MAP.get(msg.get('role', 'user'))) is not None
+        ]
         
         if not chat_messages:
             return {
@@ -201,7 +217,11 @@ class OpenAIInsuranceOrchestrator:
                 'content': 'I didn\'t receive a message. How can I help you with insurance?'
             }
         
-        self.logger.info(f"Injecting {len(chat_messages)} messages as conversation history")
+        self.logger.info("Injecting %s messages as conversation history", len(chat_messages))
+
+        # Obvious opening requests go straight to the specialist, skipping the coordinator's
+        # LLM call; follow-ups depend on earlier turns, so the coordinator routes those
+        start_agent_name = select_start_agent(chat_messages[-1].text) if len(chat_messages) == 1 else None
         
         try:
             from opentelemetry.trace import SpanKind
@@ -212,7 +232,8 @@ class OpenAIInsuranceOrchestrator:
                 mode="azure_openai"
             )
             
-            with _tracer.start_as_current_span(
+            # Identical read-only tool calls within this conversation reuse the first result
+            with conversation_memo(), _tracer.start_as_current_span(
                 "insurance_conversation",
                 kind=SpanKind.SERVER,
                 attributes={
@@ -229,22 +250,31 @@ class OpenAIInsuranceOrchestrator:
                 final_response = ""
                 responding_agent = "ins-coordinator"
                 
-                async for event in self._workflow.run_stream(chat_messages):
-                    if isinstance(event, RequestInfoEvent):
+                async for event in self._build_workflow(start_agent_name).run_stream(chat_messages):
+                    if isinstance(event, AgentRunUpdateEvent):
+                        # Token-level updates; the final reply is still taken from the events below
+                        if on_delta is not None:
+                            text = event.data.text
+                            if text:
+                                on_delta(event.executor_id, text)
+                    
+                    elif isinstance(event, RequestInfoEvent):
                         # Handle HandoffAgentUserRequest with agent_response
-                        if hasattr(event.data, 'agent_response') and event.data.agent_response:
-                            agent_response = event.data.agent_response
-                            if hasattr(agent_response, 'text') and agent_response.text:
-                                final_response = agent_response.text
-                                responding_agent = event.source_executor_id or "ins-coordinator"
+                        # (.text joins all message contents, so read it only once per event)
+                        agent_response = getattr(event.data, 'agent_response', None)
+                        text = getattr(agent_response, 'text', None) if agent_response else None
+                        if text:
+                            final_response = text
+                            responding_agent = event.source_executor_id or "ins-coordinator"
                     
                     elif isinstance(event, ExecutorCompletedEvent):
-                        if event.data is not None:
-                            if hasattr(event.data, 'text') and event.data.text:
-                                final_response = event.data.text
-                                responding_agent = event.executor_id or "ins-coordinator"
+                        data = event.data
+                        text = getattr(data, 'text', None) if data is not None else None
+                        if text:
+                            final_response = text
+                            responding_agent = event.executor_id or "ins-coordinator"
                 
-                self.logger.info(f"Final response: {len(final_response)} chars from '{responding_agent}'")
+                self.logger.info("Final response: %s chars from '%s'", len(final_response), responding_agent)
                 
                 session_span.set_attribute("response.agent", responding_agent)
                 session_span.set_attribute("response.length", len(final_response))
@@ -256,7 +286,7 @@ class OpenAIInsuranceOrchestrator:
                 }
             
         except Exception as e:
-            self.logger.error(f"Error processing conversation: {str(e)}")
+            self.logger.error("Error processing conversation: %s", e)
             import traceback
             traceback.print_exc()
             return {
@@ -288,13 +318,15 @@ def create_specialist_agents(chat_client: AzureOpenAIChatClient) -> tuple[ChatAg
     crm_agent = chat_client.as_agent(
         instructions=AGENT_DEFINITIONS["ins-crm-agent"]["instructions"],
         name="ins-crm-agent",
-        tools=crm_insurance_functions
+        tools=functions_to_ai_functions(crm_insurance_functions),
+        default_options=SPECIALIST_AGENT_OPTIONS
     )
     
     policies_agent = chat_client.as_agent(
         instructions=AGENT_DEFINITIONS["ins-policies-agent"]["instructions"],
         name="ins-policies-agent",
-        tools=policies_functions
+        tools=functions_to_ai_functions(policies_functions),
+        default_options=SPECIALIST_AGENT_OPTIONS
     )
     
     print(f"✅ Created coordinator agent: {coordinator.name}")
@@ -304,19 +336,19 @@ def create_specialist_agents(chat_client: AzureOpenAIChatClient) -> tuple[ChatAg
     return coordinator, crm_agent, policies_agent
 
 
-async def handle_workflow_events(events: list[WorkflowEvent]) -> list[RequestInfoEvent]:
+async def handle_workflow_events(events: AsyncIterable[WorkflowEvent]) -> list[RequestInfoEvent]:
     """
-    Process workflow events and return any pending input requests.
+    Process workflow events as they stream in and return any pending input requests.
     
     Args:
-        events: List of workflow events to process
+        events: Stream of workflow events to process
         
     Returns:
         List of pending input requests
     """
     pending_requests = []
     
-    for event in events:
+    async for event in events:
         if isinstance(event, RequestInfoEvent):
             pending_requests.append(event)
             request_data = event.data
@@ -366,13 +398,12 @@ async def main():
                 api_key=api_key
             )
         else:
-            from azure.identity import DefaultAzureCredential
-            credential = DefaultAzureCredential()
+            from util import get_azure_credential
             print("🔐 Using DefaultAzureCredential")
             chat_client = AzureOpenAIChatClient(
                 endpoint=endpoint,
                 deployment_name=deployment_name,
-                credential=credential
+                credential=get_azure_credential()
             )
         
         coordinator, crm_agent, policies_agent = create_specialist_agents(chat_client)
@@ -404,9 +435,7 @@ async def run_workflow(
             participants=[coordinator, crm_agent, policies_agent],
         )
         .with_start_agent(coordinator)
-        .with_termination_condition(
-            lambda conv: sum(1 for msg in conv if msg.role.value == "user") >= 10
-        )
+        .with_termination_condition(user_turn_limit_reached)
         .build()
     )
     
@@ -460,16 +489,12 @@ async def run_workflow(
                         "session.id": session_id
                     }
                 ) as turn_span:
-                    handoffs = []
-                    
-                    events = [event async for event in workflow.run_stream(user_input)]
-                    
-                    for event in events:
-                        if isinstance(event, RequestInfoEvent):
-                            if hasattr(event, 'data') and hasattr(event.data, 'awaiting_agent_id'):
-                                handoffs.append(event.data.awaiting_agent_id)
-                    
-                    pending_requests = await handle_workflow_events(events)
+                    # Handle events as they stream in instead of collecting the whole run first
+                    pending_requests = await handle_workflow_events(workflow.run_stream(user_input))
+                    handoffs = [
+                        request.data.awaiting_agent_id for request in pending_requests
+                        if hasattr(request.data, 'awaiting_agent_id')
+                    ]
                     
                     if handoffs:
                         turn_span.set_attribute("turn.handoffs", ",".join(handoffs))
@@ -492,8 +517,7 @@ async def run_workflow(
                         }
                     ):
                         responses = {req.request_id: user_response for req in pending_requests}
-                        events = [event async for event in workflow.send_responses_streaming(responses)]
-                        pending_requests = await handle_workflow_events(events)
+                        pending_requests = await handle_workflow_events(workflow.send_responses_streaming(responses))
                 
                 print()
                 
@@ -0,0 +1,205 @@
+"""
+Semantic cache for reusable LLM results (e.g. research plans).
+
+Lookups first try an exact match on the normalized text and only then fall back
+to cosine similarity over text embeddings, so paraphrased requests can reuse a
+previously computed result instead of paying for another LLM round-trip.
+"""
+
+import math
+import time
+import asyncio
+import logging
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    In-process cache keyed by text, with exact-match and embedding-similarity lookups.
+
+    The embeddings client is optional: without it the cache degrades to an
+    exact-match cache on the normalized text.
+    """
+
+    def __init__(
+        self,
+        embeddings_client: Any = None,
+        similarity_threshold: float = 0.92,
+        ttl_seconds: float = 3600,
+        max_entries: int = 512,
+        batch_size: int = 8,
+        batch_wait_ms: float = 25
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            embeddings_client: Async azure.ai.inference EmbeddingsClient, or None for exact-match only
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            ttl_seconds: Time-to-live of each entry
+            max_entries: Maximum number of entries kept (oldest evicted first)
+            batch_size: Maximum number of texts embedded in one request
+            batch_wait_ms: How long concurrent lookups are coalesced into one embedding request
+        """
+        self.embeddings_client = embeddings_client
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+
+        # normalized text -> (expires_at, unit embedding or None, value)
+        self._entries: dict[str, tuple[float, Optional[list[float]], Any]] = {}
+        # embeddings computed on a miss, reused when the result is stored
+        self._pending_vectors: dict[str, list[float]] = {}
+
+        # Concurrent embedding requests are coalesced into batches by a background worker
+        self._embed_queue: Optional[asyncio.Queue] = None
+        self._embed_worker: Optional[asyncio.Task] = None
+        self._embeds_in_flight = 0
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Normalize text for exact-match lookups."""
+        return " ".join(text.lower().split())
+
+    async def _embed(self, text: str) -> Optional[list[float]]:
+        """Compute a unit-length embedding for the text, or None if unavailable."""
+        if self.embeddings_client is None:
+            return None
+
+        self._embeds_in_flight += 1
+        try:
+            if self._embeds_in_flight == 1:
+                # Nothing to coalesce with, embed directly
+                vectors = await self._embed_batch([text])
+                return vectors[0]
+
+            if self._embed_worker is None or self._embed_worker.done():
+                self._embed_queue = asyncio.Queue()
+                self._embed_worker = asyncio.create_task(self._run_embed_worker())
+            future = asyncio.get_running_loop().create_future()
+            await self._embed_queue.put((text, future))
+            return await future
+        finally:
+            self._embeds_in_flight -= 1
+
+    async def _embed_batch(self, texts: list[str]) -> list[Optional[list[float]]]:
+        """Embed a batch of texts in a single request."""
+        try:
+            response = await self.embeddings_client.embed(input=texts)
+            vectors = []
+            for item in sorted(response.data, key=lambda d: d.index):
+                norm = math.sqrt(sum(v * v for v in item.embedding)) or 1.0
+                vectors.append([v / norm for v in item.embedding])
+        except Exception as e:
+            logger.warning("Semantic cache embedding failed, using exact match only: %s", e)
+            return [None] * len(texts)
+        # A short response leaves the remaining texts without an embedding
+        return vectors[:len(texts)] + [None] * (len(texts) - len(vectors))
+
+    async def _run_embed_worker(self):
+        """Drain queued embedding requests, batching those that arrive within the wait window."""
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._embed_queue.get()]
+                deadline = loop.time() + self.batch_wait_ms / 1000
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._embed_queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                vectors = []
+                try:
+                    vectors = await self._embed_batch([text for text, _ in batch])
+                except Exception:
+                    logger.exception("Semantic cache embedding batch failed")
+                finally:
+                    # Every caller gets an answer (None: exact match only), even if
+                    # the batch failed or the worker was cancelled mid-request
+                    for i, (_, future) in enumerate(batch):
+                        if not future.done():
+                            future.set_result(vectors[i] if i < len(vectors) else None)
+        finally:
+            # Requests still queued would otherwise wait for a worker that is gone
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+            while not self._embed_queue.empty():
+                _, future = self._embed_queue.get_nowait()
+                if not future.done():
+                    future.set_result(None)
+
+    def _evict_expired(self, now: float):
+        """Drop expired entries."""
+        expired = [key for key, (expires_at, _, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    async def get(self, text: str) -> Optional[Any]:
+        """
+        Look up a cached value for the text.
+
+        Args:
+            text: The lookup text (e.g. the user query)
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        key = self._normalize(text)
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            logger.info("Semantic cache exact hit")
+            return entry[2]
+
+        vector = await self._embed(key)
+        if vector is None:
+            return None
+
+        best_score, best_value = 0.0, None
+        for expires_at, cached_vector, value in self._entries.values():
+            if expires_at <= now or cached_vector is None:
+                continue
+            score = sum(a * b for a, b in zip(vector, cached_vector))
+            if score > best_score:
+                best_score, best_value = score, value
+
+        if best_score >= self.similarity_threshold:
+            logger.info("Semantic cache hit (similarity=%.3f)", best_score)
+            return best_value
+
+        if len(self._pending_vectors) >= self.max_entries:
+            self._pending_vectors.clear()
+        self._pending_vectors[key] = vector
+        return None
+
+    async def set(self, text: str, value: Any):
+        """
+        Store a value for the text.
+
+        Args:
+            text: The lookup text (e.g. the user query)
+            value: The value to cache
+        """
+        key = self._normalize(text)
+        now = time.monotonic()
+
+        vector = self._pending_vectors.pop(key, None)
+        if vector is None:
+            vector = await self._embed(key)
+
+        self._evict_expired(now)
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+        self._entries[key] = (now + self.ttl_seconds, vector, value)
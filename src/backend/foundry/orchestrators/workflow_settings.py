@@ -0,0 +1,28 @@
+"""
+Settings shared by the banking and insurance handoff workflows.
+
+Both the Foundry and the OpenAI orchestrators replay the stored chat history
+into the same kind of handoff workflow, so how history is replayed and when
+the workflow ends is defined once here.
+"""
+
+import os
+
+from agent_framework import ChatMessage, Role
+
+# Specialist agents may issue several independent tool calls in one turn
+# (e.g. looking up two clients at once); the framework runs them concurrently.
+SPECIALIST_AGENT_OPTIONS = {"allow_multiple_tool_calls": True}
+
+# Only the most recent messages are replayed to the workflow (0 replays the whole chat)
+HISTORY_MAX_MESSAGES = int(os.getenv("CONVERSATION_HISTORY_MAX_MESSAGES", 0))
+# Stored roles mapped to the shared Role constants (unknown roles are not replayed)
+ROLE_MAP = {"user": Role.USER, "assistant": Role.ASSISTANT, "system": Role.SYSTEM}
+
+# The handoff workflow ends after this many user turns
+MAX_USER_TURNS = 10
+
+
+def user_turn_limit_reached(conversation: list[ChatMessage]) -> bool:
+    """Termination condition of the handoff workflow (shared by every build)."""
+    return sum(1 for msg in conversation if msg.role == Role.USER) >= MAX_USER_TURNS
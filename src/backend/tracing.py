@@ -16,14 +16,31 @@ See: https://opentelemetry.io/docs/specs/semconv/gen-ai/gen-ai-agent-spans/
 
 import os
 import logging
-from pathlib import Path
-from dotenv import load_dotenv
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from typing import Optional, Sequence
+from opentelemetry.trace import SpanKind, StatusCode
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.sdk.trace.sampling import TraceIdRatioBased
+
+from util import get_azure_credential, load_backend_dotenv
 
 # Load .env from backend directory
-_backend_dir = Path(__file__).parent
-_env_file = _backend_dir / ".env"
-if _env_file.exists():
-    load_dotenv(_env_file)
+load_backend_dotenv()
+
+# Resolve the Agent Framework observability helpers once instead of on every call
+try:
+    from agent_framework.observability import (
+        configure_otel_providers as _af_configure_otel_providers,
+        get_tracer as _af_get_tracer,
+    )
+except ImportError:
+    _af_configure_otel_providers = None
+    _af_get_tracer = None
+
+logger = logging.getLogger(__name__)
 
 # Suppress noisy loggers
 logging.getLogger("opentelemetry.sdk.trace").setLevel(logging.ERROR)
@@ -31,13 +48,179 @@ logging.getLogger("azure.monitor.opentelemetry.exporter.export").setLevel(loggin
 logging.getLogger("azure.core.pipeline.policies.http_logging_policy").setLevel(logging.WARNING)
 
 _TRACING_CONFIGURED = False
-_CONVERSATION_ID_HOLDER = {}  # Thread-safe holder for conversation ID propagation
+_SETUP_LOCK = threading.Lock()
+# Conversation attributes of the current request; asyncio tasks spawned while
+# handling it inherit them, and nothing outlives the request's context
+_CONVERSATION_CONTEXT: ContextVar[Optional[dict]] = ContextVar("moneta_conversation_context", default=None)
+
+
+# BatchSpanProcessor settings for bursty agent traffic (a turn emits agent, chat
+# and tool spans in quick succession): a larger queue so bursts aren't dropped,
+# and a shorter delay/timeout so spans show up (and export failures surface)
+# quickly. Values already set in the environment take precedence.
+_BATCH_SPAN_PROCESSOR_DEFAULTS = {
+    "OTEL_BSP_MAX_QUEUE_SIZE": "4096",
+    "OTEL_BSP_SCHEDULE_DELAY": "1000",
+    "OTEL_BSP_MAX_EXPORT_BATCH_SIZE": "256",
+    "OTEL_BSP_EXPORT_TIMEOUT": "10000",
+}
+
+# Exporter settings: gzip OTLP payloads (prompts and responses are recorded, and
+# compress well). The Azure Monitor trace exporter has no compression option.
+_EXPORTER_DEFAULTS = {
+    "OTEL_EXPORTER_OTLP_COMPRESSION": "gzip",
+}
+
+
+# Span attribute limits: recorded prompts and responses can be long, and the
+# exporter serializes the full value (Azure Monitor only truncates on ingestion).
+# SpanLimits reads these when the tracer provider is created.
+_SPAN_LIMIT_DEFAULTS = {
+    "OTEL_SPAN_ATTRIBUTE_VALUE_LENGTH_LIMIT": "4096",
+    "OTEL_SPAN_ATTRIBUTE_COUNT_LIMIT": "128",
+}
+
+
+def _apply_env_defaults(defaults: dict):
+    """Apply tracing defaults (read by the SDK when processors/exporters are created)."""
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+
+
+# Share of normal traces exported (OTEL_TRACES_SAMPLER_ARG overrides it); traces
+# with an error or high-risk span are always exported
+_DEFAULT_SAMPLING_RATIO = 0.2
+_HIGH_RISK_LEVELS = frozenset({"high", "critical"})
+# Bounds on the traces held back while their root is still open, and on the
+# remembered decisions (for spans that end after their root)
+_MAX_PENDING_TRACES = 1024
+_MAX_DECIDED_TRACES = 4096
+
+
+def _is_priority_span(span) -> bool:
+    """Whether an ended span reports an error or a high risk level."""
+    attributes = span.attributes or {}
+    return (span.status.status_code is StatusCode.ERROR
+            or bool(attributes.get("error"))
+            or attributes.get("risk_level") in _HIGH_RISK_LEVELS)
+
+
+class PriorityTraceProcessor(SpanProcessor):
+    """
+    Export whole traces that contain an error or high-risk span, and a ratio of the rest.
+
+    A sampler decides when a span starts, before errors are known (they surface
+    on child tool spans, or when a span ends). So every span is recorded, and
+    ended spans are held back per trace until the trace's local root ends; the
+    whole trace is then passed on to the wrapped (exporting) processors or dropped.
+    """
+
+    def __init__(self, processors: Sequence[SpanProcessor], ratio: float):
+        self._processors = tuple(processors)
+        self._bound = TraceIdRatioBased.get_bound_for_rate(ratio)
+        self._pending: OrderedDict[int, list] = OrderedDict()
+        self._decided: OrderedDict[int, bool] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        for processor in self._processors:
+            processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        trace_id = span.context.trace_id
+        is_local_root = span.parent is None or span.parent.is_remote
+        kept = []
+        with self._lock:
+            keep = self._decided.get(trace_id)
+            if keep is not None:
+                # Ended after its root: follow the trace's decision
+                if keep:
+                    kept.append(span)
+            else:
+                self._pending.setdefault(trace_id, []).append(span)
+                if is_local_root:
+                    kept.extend(self._decide(trace_id, self._pending.pop(trace_id)))
+                # Too many open traces: decide the oldest early with what they have
+                while len(self._pending) > _MAX_PENDING_TRACES:
+                    kept.extend(self._decide(*self._pending.popitem(last=False)))
+        for ended_span in kept:
+            for processor in self._processors:
+                processor.on_end(ended_span)
+
+    def _decide(self, trace_id: int, spans: list) -> list:
+        """Record whether a trace is exported; returns its spans if it is."""
+        keep = (trace_id & TraceIdRatioBased.TRACE_ID_LIMIT) < self._bound or any(map(_is_priority_span, spans))
+        self._decided[trace_id] = keep
+        while len(self._decided) > _MAX_DECIDED_TRACES:
+            self._decided.popitem(last=False)
+        return spans if keep else []
+
+    def shutdown(self):
+        # Decide the traces still open, so their spans aren't silently lost
+        with self._lock:
+            kept = []
+            while self._pending:
+                kept.extend(self._decide(*self._pending.popitem(last=False)))
+        for ended_span in kept:
+            for processor in self._processors:
+                processor.on_end(ended_span)
+        for processor in self._processors:
+            processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return all(processor.force_flush(timeout_millis) for processor in self._processors)
+
+
+def _sampling_ratio() -> Optional[float]:
+    """
+    Get the share of normal traces to export.
+
+    Returns:
+        The ratio, or None when every trace is exported: a ratio of 1 or more,
+        or OTEL_TRACES_SAMPLER set (e.g. `always_on` in tests), which leaves
+        sampling to the SDK
+    """
+    if os.getenv("OTEL_TRACES_SAMPLER"):
+        return None
+    try:
+        ratio = float(os.getenv("OTEL_TRACES_SAMPLER_ARG", _DEFAULT_SAMPLING_RATIO))
+    except ValueError:
+        ratio = _DEFAULT_SAMPLING_RATIO
+    return ratio if ratio < 1 else None
+
+
+def _install_priority_trace_processor(tracer_provider) -> bool:
+    """
+    Put the provider's span processors behind a PriorityTraceProcessor.
+
+    Like _replace_simple_span_processors, this edits the provider's private
+    processor list, hence the defensive access.
+
+    Returns:
+        Whether traces are now sampled
+    """
+    ratio = _sampling_ratio()
+    if ratio is None:
+        return False
+    try:
+        multi_processor = tracer_provider._active_span_processor
+        processors = multi_processor._span_processors
+    except AttributeError:
+        return False
+    with multi_processor._lock:
+        multi_processor._span_processors = (PriorityTraceProcessor(processors, ratio),)
+    logger.info("Tracing: exporting %.0f%% of traces, plus every trace with an error or high-risk span", ratio * 100)
+    return True
 
 
+@lru_cache(maxsize=1)
 def _get_foundry_appinsights_connection_string() -> str:
     """
     Get Application Insights connection string from Foundry project.
     This ensures traces appear in Foundry portal's Tracing tab.
+
+    Looked up once per process (a missing endpoint or failed lookup included),
+    using the shared credential instead of building a new one.
     """
     project_endpoint = os.getenv("PROJECT_ENDPOINT")
     if not project_endpoint:
@@ -45,21 +228,68 @@ def _get_foundry_appinsights_connection_string() -> str:
     
     try:
         from azure.ai.projects import AIProjectClient
-        from azure.identity import DefaultAzureCredential
         
         project_client = AIProjectClient(
-            credential=DefaultAzureCredential(),
+            credential=get_azure_credential(),
             endpoint=project_endpoint
         )
         
         conn_str = project_client.telemetry.get_application_insights_connection_string()
-        print(f"📊 Got App Insights connection string from Foundry project")
+        logger.info("Got App Insights connection string from Foundry project")
         return conn_str
     except Exception as e:
-        print(f"⚠️  Could not get connection string from Foundry: {e}")
+        logger.warning("Could not get connection string from Foundry: %s", e)
         return None
 
 
+@lru_cache(maxsize=4)
+def _build_exporter(conn_str: str):
+    """
+    Create the Azure Monitor exporter for a connection string, once.
+
+    If the Agent Framework setup fails after creating its exporter, the manual
+    fallback reuses it instead of opening a second connection pool.
+    """
+    from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter
+    return AzureMonitorTraceExporter(connection_string=conn_str)
+
+
+def _replace_simple_span_processors(tracer_provider) -> int:
+    """
+    Swap any SimpleSpanProcessor on the provider for a BatchSpanProcessor.
+
+    SimpleSpanProcessor exports synchronously when each span ends, i.e. one
+    blocking HTTP request per span on the request path. Instrumentors can add
+    one behind our back, so it is checked after setup. The processor list is a
+    private SDK attribute, hence the defensive access.
+
+    Returns:
+        Number of processors replaced
+    """
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+
+    try:
+        multi_processor = tracer_provider._active_span_processor
+        processors = multi_processor._span_processors
+    except AttributeError:
+        return 0
+
+    replaced = 0
+    new_processors = []
+    for processor in processors:
+        if isinstance(processor, SimpleSpanProcessor):
+            # Not shut down: that would also shut down the exporter we keep using
+            processor = BatchSpanProcessor(processor.span_exporter)
+            replaced += 1
+        new_processors.append(processor)
+
+    if replaced:
+        with multi_processor._lock:
+            multi_processor._span_processors = tuple(new_processors)
+        logger.warning("Tracing: replaced %d synchronous SimpleSpanProcessor(s) with BatchSpanProcessor", replaced)
+    return replaced
+
+
 def setup_tracing(
     connection_string: str = None,
     service_name: str = "moneta-agents"
@@ -72,13 +302,22 @@ def setup_tracing(
     - chat model spans  
     - execute_tool spans
     
-    Call this ONCE at application startup.
+    Call this ONCE at application startup (later and concurrent calls are safe).
     """
-    global _TRACING_CONFIGURED
-    
     if _TRACING_CONFIGURED:
         return True
     
+    # Only one caller configures the providers (and looks up the connection string)
+    with _SETUP_LOCK:
+        if _TRACING_CONFIGURED:
+            return True
+        return _configure_tracing(connection_string, service_name)
+
+
+def _configure_tracing(connection_string: str, service_name: str) -> bool:
+    """Configure the tracer provider; called by setup_tracing under _SETUP_LOCK."""
+    global _TRACING_CONFIGURED
+    
     # Priority: 1) Provided connection string, 2) Foundry project's App Insights, 3) Env var
     conn_str = connection_string
     if not conn_str:
@@ -87,36 +326,43 @@ def setup_tracing(
         conn_str = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
     
     if not conn_str:
-        print("⚠️  No Application Insights connection string available - tracing disabled")
+        logger.warning("No Application Insights connection string available - tracing disabled")
         return False
     
+    # Both the Agent Framework and the manual setup create a BatchSpanProcessor
+    _apply_env_defaults(_BATCH_SPAN_PROCESSOR_DEFAULTS)
+    _apply_env_defaults(_EXPORTER_DEFAULTS)
+    _apply_env_defaults(_SPAN_LIMIT_DEFAULTS)
+    
+    if _af_configure_otel_providers is None:
+        logger.warning("Agent Framework observability not available - falling back to manual OpenTelemetry setup")
+        return _setup_manual_tracing(conn_str, service_name)
+    
     try:
         # Use Agent Framework's configure_otel_providers with Azure Monitor exporter
         # This properly instruments agent spans with parent-child relationships
-        from agent_framework.observability import configure_otel_providers
-        from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter
-        
-        # Create Azure Monitor exporter
-        azure_exporter = AzureMonitorTraceExporter(connection_string=conn_str)
+        azure_exporter = _build_exporter(conn_str)
         
-        configure_otel_providers(
+        _af_configure_otel_providers(
             enable_sensitive_data=True,  # Include prompts/responses in traces
             exporters=[azure_exporter]
         )
         
+        from opentelemetry import trace
+        tracer_provider = trace.get_tracer_provider()
+        _replace_simple_span_processors(tracer_provider)
+        _install_priority_trace_processor(tracer_provider)
+        
         _TRACING_CONFIGURED = True
-        print(f"✅ Tracing configured via Agent Framework configure_otel_providers")
-        print(f"   - Application Insights: configured (Foundry-connected)")
-        print(f"   - Sensitive data recording: enabled")
+        logger.info("Tracing configured via Agent Framework configure_otel_providers "
+                    "(Application Insights: Foundry-connected, sensitive data recording: enabled)")
         return True
         
     except ImportError as e:
-        print(f"⚠️  Agent Framework observability not available: {e}")
-        print("   Falling back to manual OpenTelemetry setup...")
+        logger.warning("Agent Framework observability not available: %s - falling back to manual OpenTelemetry setup", e)
         return _setup_manual_tracing(conn_str, service_name)
     except Exception as e:
-        print(f"❌ Agent Framework observability failed: {e}")
-        print("   Falling back to manual OpenTelemetry setup...")
+        logger.error("Agent Framework observability failed: %s - falling back to manual OpenTelemetry setup", e)
         return _setup_manual_tracing(conn_str, service_name)
 
 
@@ -132,57 +378,55 @@ def _setup_manual_tracing(conn_str: str, service_name: str) -> bool:
         from opentelemetry.sdk.trace import TracerProvider
         from opentelemetry.sdk.trace.export import BatchSpanProcessor
         from opentelemetry.sdk.resources import Resource
-        from opentelemetry.semconv.resource import ResourceAttributes
-        from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter
         
-        # Create resource with service name
-        resource = Resource.create({
-            ResourceAttributes.SERVICE_NAME: service_name
+        # Create resource with service name (the constructor skips Resource.create's
+        # resource detectors, whose output the exporter doesn't need)
+        resource = Resource({
+            "service.name": service_name
         })
         
         # Create tracer provider
         tracer_provider = TracerProvider(resource=resource)
         
         # Add Azure Monitor exporter
-        exporter = AzureMonitorTraceExporter(connection_string=conn_str)
-        tracer_provider.add_span_processor(BatchSpanProcessor(exporter))
+        tracer_provider.add_span_processor(BatchSpanProcessor(_build_exporter(conn_str)))
         
         # Set as global tracer provider
         trace.set_tracer_provider(tracer_provider)
         
-        print(f"📊 Tracing: Azure Monitor exporter configured (manual)")
+        logger.info("Tracing: Azure Monitor exporter configured (manual)")
         
         # Enable Azure AI Inference instrumentor for Foundry Gen AI traces
         try:
             from azure.ai.inference.tracing import AIInferenceInstrumentor
             AIInferenceInstrumentor().instrument()
-            print(f"📊 Tracing: AI Inference instrumentor enabled")
+            logger.info("Tracing: AI Inference instrumentor enabled")
         except Exception as e:
-            print(f"⚠️  AIInferenceInstrumentor: {e}")
+            logger.warning("AIInferenceInstrumentor: %s", e)
+        
+        _replace_simple_span_processors(tracer_provider)
+        _install_priority_trace_processor(tracer_provider)
         
         _TRACING_CONFIGURED = True
-        print(f"✅ Tracing configured for App Insights (manual fallback)")
+        logger.info("Tracing configured for App Insights (manual fallback)")
         return True
         
     except Exception as e:
-        print(f"❌ Manual tracing configuration failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Manual tracing configuration failed: %s", e)
         return False
 
 
+@lru_cache(maxsize=32)
 def get_tracer(name: str = __name__):
-    """Get an OpenTelemetry tracer for custom spans."""
-    try:
-        # Prefer Agent Framework's get_tracer if available
-        from agent_framework.observability import get_tracer as af_get_tracer
-        return af_get_tracer()
-    except ImportError:
-        from opentelemetry import trace
-        return trace.get_tracer(name)
+    """Get an OpenTelemetry tracer for custom spans (created once per name)."""
+    # Prefer Agent Framework's get_tracer if available
+    if _af_get_tracer is not None:
+        return _af_get_tracer()
+    from opentelemetry import trace
+    return trace.get_tracer(name)
 
 
-def set_conversation_context(conversation_id: str, user_id: str = None, mode: str = None):
+def set_conversation_context(conversation_id: str, user_id: str = None, mode: str = None) -> Token:
     """
     Set the conversation context for attribute propagation to child spans.
     
@@ -194,17 +438,19 @@ def set_conversation_context(conversation_id: str, user_id: str = None, mode: st
         conversation_id: The unique conversation/session ID
         user_id: Optional user identifier
         mode: Optional mode indicator (e.g., 'foundry' or 'azure_openai')
+        
+    Returns:
+        Token that restores the previous context when passed to clear_conversation_context
     """
-    import threading
-    thread_id = threading.current_thread().ident
-    _CONVERSATION_ID_HOLDER[thread_id] = {
+    context = {
         "gen_ai.conversation.id": conversation_id,
         "session.id": conversation_id,
     }
     if user_id:
-        _CONVERSATION_ID_HOLDER[thread_id]["user.id"] = user_id
+        context["user.id"] = user_id
     if mode:
-        _CONVERSATION_ID_HOLDER[thread_id]["session.mode"] = mode
+        context["session.mode"] = mode
+    return _CONVERSATION_CONTEXT.set(context)
 
 
 def get_conversation_context() -> dict:
@@ -214,17 +460,27 @@ def get_conversation_context() -> dict:
     Returns:
         Dictionary of attributes to propagate to child spans
     """
-    import threading
-    thread_id = threading.current_thread().ident
-    return _CONVERSATION_ID_HOLDER.get(thread_id, {})
+    return _CONVERSATION_CONTEXT.get() or {}
+
 
+def clear_conversation_context(token: Token = None):
+    """
+    Clear the conversation context after processing is complete.
+    
+    Args:
+        token: Token returned by set_conversation_context to restore the previous
+               context; without it the context is simply emptied
+    """
+    if token is not None:
+        _CONVERSATION_CONTEXT.reset(token)
+    else:
+        _CONVERSATION_CONTEXT.set(None)
 
-def clear_conversation_context():
-    """Clear the conversation context after processing is complete."""
-    import threading
-    thread_id = threading.current_thread().ident
-    if thread_id in _CONVERSATION_ID_HOLDER:
-        del _CONVERSATION_ID_HOLDER[thread_id]
+
+# Attributes shared by every span from create_foundry_span
+_FOUNDRY_SPAN_ATTRIBUTES = {
+    "gen_ai.provider.name": "microsoft.agent_framework",
+}
 
 
 def create_foundry_span(tracer, name: str, conversation_id: str, agent_name: str = None, 
@@ -247,14 +503,10 @@ def create_foundry_span(tracer, name: str, conversation_id: str, agent_name: str
     Returns:
         A context manager for the span
     """
-    from opentelemetry.trace import SpanKind
-    
     # Build required attributes per OpenTelemetry GenAI semantic conventions
-    attributes = {
-        "gen_ai.conversation.id": conversation_id,  # Critical for Foundry trace correlation
-        "gen_ai.provider.name": "microsoft.agent_framework",
-        "session.id": conversation_id,
-    }
+    attributes = _FOUNDRY_SPAN_ATTRIBUTES.copy()
+    attributes["gen_ai.conversation.id"] = conversation_id  # Critical for Foundry trace correlation
+    attributes["session.id"] = conversation_id
     
     if agent_name:
         attributes["gen_ai.agent.name"] = agent_name
@@ -264,7 +516,8 @@ def create_foundry_span(tracer, name: str, conversation_id: str, agent_name: str
         attributes["gen_ai.request.model"] = model
     
     # Merge extra attributes
-    attributes.update(extra_attributes)
+    if extra_attributes:
+        attributes.update(extra_attributes)
     
     return tracer.start_as_current_span(
         name,
@@ -287,9 +540,18 @@ class _TracingManager:
             self._tracer = get_tracer("function-tracing")
         return self._tracer
     
-    def trace_function_call(self, function_name: str, **kwargs):
-        """Create a span for a function call."""
-        return self.tracer.start_as_current_span(function_name, attributes=kwargs)
+    def trace_function_call(self, function_name: str, attributes: Optional[dict] = None, **kwargs):
+        """
+        Create a span for a function call.
+
+        Attributes can be passed as a dict (used as is, without copying) and/or
+        as keyword arguments; keyword arguments win on conflicts.
+        """
+        if attributes is None:
+            attributes = kwargs
+        elif kwargs:
+            attributes = {**attributes, **kwargs}
+        return self.tracer.start_as_current_span(function_name, attributes=attributes)
 
 
 _tracing_manager = None
@@ -1,18 +1,166 @@
 """
 Utility functions for the Moneta backend.
 """
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
 from io import StringIO
+from pathlib import Path
 from subprocess import run, PIPE
 import logging
+from functools import lru_cache
+from typing import Any, Optional
 from dotenv import load_dotenv
 
+# orjson is an optional, faster drop-in for parsing and serializing JSON payloads
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_BACKEND_ENV_FILE = Path(__file__).parent / ".env"
+
+
+@lru_cache(maxsize=None)
+def load_backend_dotenv():
+    """Load the backend .env file, once per process (later calls are no-ops)."""
+    load_dotenv(_BACKEND_ENV_FILE)
+
+
+# `azd env get-values` takes hundreds of milliseconds, so its output is cached
+# (per project directory and azd environment) and reused by processes started
+# shortly after, until azd's own .env for that environment changes
+_AZD_ENV_CACHE_DIR = Path.home() / ".cache" / "moneta"
+_AZD_ENV_CACHE_TTL = 300  # seconds
+
+
+def _azd_active_env_file() -> tuple[str, Optional[Path]]:
+    """
+    Find the active azd environment the way azd does.
+
+    Returns:
+        The environment name (AZURE_ENV_NAME, or the project's default
+        environment) and its .env file, or None if no azd project was found
+    """
+    cwd = Path.cwd()
+    # azd looks for azure.yaml from the working directory upwards
+    project_dir = next((d for d in (cwd, *cwd.parents) if (d / "azure.yaml").exists()), None)
+    env_name = os.getenv("AZURE_ENV_NAME", "")
+    if project_dir is None:
+        return env_name, None
+    if not env_name:
+        try:
+            config = json.loads((project_dir / ".azure" / "config.json").read_text())
+            env_name = config.get("defaultEnvironment", "")
+        except (OSError, ValueError):
+            pass
+    return env_name, project_dir / ".azure" / env_name / ".env"
+
+
+def _azd_env_cache_path(env_name: str) -> Path:
+    project_hash = hashlib.sha256(f"{os.getcwd()}\0{env_name}".encode()).hexdigest()[:16]
+    return _AZD_ENV_CACHE_DIR / f"azd-env-{project_hash}.env"
+
+
+def _azd_env_cache_is_fresh(cache_path: Path, env_file: Optional[Path]) -> bool:
+    try:
+        cache_mtime = cache_path.stat().st_mtime
+    except OSError:
+        return False
+    if time.time() - cache_mtime >= _AZD_ENV_CACHE_TTL:
+        return False
+    # `azd env set`/`azd provision` rewrite the environment's .env
+    try:
+        return env_file is None or env_file.stat().st_mtime <= cache_mtime
+    except OSError:
+        return True
+
+
+def _write_azd_env_cache(cache_path: Path, values: str):
+    """Write the azd values atomically (readable by the owner only, like azd's own .env)."""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as tmp_file:
+            tmp_file.write(values)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logging.warning("Could not cache AZD environment: %s", e)
+
 
 def load_dotenv_from_azd():
     """Load environment variables from azd or fall back to .env file."""
-    result = run("azd env get-values", stdout=PIPE, stderr=PIPE, shell=True, text=True)
+    # Hosted deployments (App Service, Container Apps) get their settings from
+    # the environment and have no azd to ask
+    if os.getenv("WEBSITE_SITE_NAME") or os.getenv("CONTAINER_APP_NAME") or not shutil.which("azd"):
+        logging.info("AZD not available. Trying to load from .env file...")
+        load_backend_dotenv()
+        return
+
+    env_name, env_file = _azd_active_env_file()
+    cache_path = _azd_env_cache_path(env_name)
+    if _azd_env_cache_is_fresh(cache_path, env_file):
+        logging.info("Found cached AZD environment. Loading...")
+        load_dotenv(cache_path)
+        return
+
+    result = run(["azd", "env", "get-values"], stdout=PIPE, stderr=PIPE, text=True)
     if result.returncode == 0:
         logging.info("Found AZD environment. Loading...")
         load_dotenv(stream=StringIO(result.stdout))
+        _write_azd_env_cache(cache_path, result.stdout)
     else:
         logging.info("AZD environment not found. Trying to load from .env file...")
-        load_dotenv()
+        load_backend_dotenv()
+
+
+@lru_cache(maxsize=None)
+def get_azure_credential():
+    """
+    Get the process-wide DefaultAzureCredential.
+
+    Building the credential chain on every request is wasted work, and a shared
+    instance also reuses its cached tokens. Interactive and VS Code credentials
+    are excluded since the backend never runs interactively.
+    """
+    from azure.identity import DefaultAzureCredential
+    return DefaultAzureCredential(
+        exclude_interactive_browser_credential=True,
+        exclude_visual_studio_code_credential=True
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_azure_credential():
+    """
+    Get the process-wide async DefaultAzureCredential.
+
+    Same credential chain as `get_azure_credential`, for the async (aio) SDK clients.
+    """
+    from azure.identity.aio import DefaultAzureCredential
+    return DefaultAzureCredential(
+        exclude_interactive_browser_credential=True,
+        exclude_visual_studio_code_credential=True
+    )
+
+
+def json_loads(data: str | bytes) -> Any:
+    """Parse JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize to a JSON string (2-space indented if requested), using orjson when it is installed."""
+    if orjson is not None:
+        # Accept the same inputs as the stdlib path: non-str keys, and str() for unknown types
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=str, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None, default=str)